@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the scraper's hot paths.
+
+    python bench.py              # run everything
+    python bench.py parse-time   # run one benchmark
+"""
+
+import argparse
+import random
+import timeit
+from datetime import date, datetime
+
+import scraper
+import stub_server
+
+
+def best_of(func, number, repeat=5):
+    """Best wall-clock time in seconds for number calls of func."""
+    return min(timeit.repeat(func, number=number, repeat=repeat))
+
+
+def report(label, seconds, calls, baseline=None):
+    per_call = seconds / calls * 1e9
+    speedup = f"  {baseline / seconds:5.1f}x" if baseline else ""
+    print(f"  {label:<28} {seconds * 1000:8.1f} ms  {per_call:7.0f} ns/call{speedup}")
+
+
+def legacy_parse_time(time_str):
+    """parse_time_to_seconds as it was before the tokenizer, for comparison."""
+    if time_str is None:
+        return None
+    time_str = str(time_str).strip()
+    if time_str == "":
+        return 0
+    if time_str == "''":
+        return 0
+    if time_str.lower() in ["s.t.", "st", "s.t"]:
+        return 0
+    return scraper._parse_time_fallback(time_str)
+
+
+def synthetic_time_column(count, seed=0):
+    """Time strings with the mix seen in results: mostly short gaps and s.t."""
+    rng = random.Random(seed)
+    column = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.25:
+            column.append(rng.choice(["s.t.", "0:00", "''", ""]))
+        elif roll < 0.3:
+            column.append(rng.choice(["-1 Lap", "-2 Laps", "DNF"]))
+        elif roll < 0.35:
+            column.append(f"1:{rng.randint(0, 9):02d}:{rng.randint(0, 59):02d}")
+        else:
+            gap = rng.randint(1, 600)
+            column.append(f"{gap // 60}:{gap % 60:02d}")
+    return column
+
+
+def bench_parse_time(size=200_000):
+    """parse_time_to_seconds: tokenizer + LRU cache vs the old parser."""
+    column = synthetic_time_column(size)
+    uncached = scraper._parse_time_cached.__wrapped__
+
+    assert all(legacy_parse_time(t) == scraper.parse_time_to_seconds(t) for t in column)
+
+    print(f"parse_time_to_seconds over {size:,} strings "
+          f"({len(set(column)):,} distinct)")
+    baseline = best_of(lambda: [legacy_parse_time(t) for t in column], 1)
+    report("legacy parser", baseline, size)
+    report("tokenizer, no cache", best_of(lambda: [uncached(t) for t in column], 1), size, baseline)
+    report("tokenizer + LRU cache",
+           best_of(lambda: [scraper.parse_time_to_seconds(t) for t in column], 1), size, baseline)
+
+
+def synthetic_races(count, seed=0):
+    """Raw results lists shaped like parse.bot payloads."""
+    rng = random.Random(seed)
+    races = []
+    for _ in range(count):
+        gap = 0
+        results = [{"position": 1, "Time": "1:02:03"}]
+        for position in range(2, rng.randint(25, 70)):
+            gap += rng.choice([0, 0, 1, 2, 3, 5, 8, 12, 20, 35])
+            time_str = rng.choice([f"{gap // 60}:{gap % 60:02d}"] * 8 + ["s.t.", "-1 Lap"])
+            results.append({"position": position, "Time": time_str})
+        races.append(results)
+    return races
+
+
+def bench_parse_times_bulk(size=500_000):
+    """parse_times_bulk on a whole column vs one parse_time_to_seconds call per string."""
+    column = synthetic_time_column(size, seed=1)
+    uncached = scraper._parse_time_cached.__wrapped__
+
+    # Missing times, decimals, non-finishers and values past int32
+    edge_cases = [None, "", "-1 Lap", "DNF", "1:02.5", " 0:12 ", "+0:05", "abc", "inf",
+                  "2147483648", "-2147483649", "99999999999:00:00"]
+    lowest, highest = scraper.TIME_INVALID + 1, 2 ** 31 - 1
+    expected = [scraper.TIME_INVALID if seconds is None else min(max(seconds, lowest), highest)
+                for seconds in map(scraper.parse_time_to_seconds, column + edge_cases)]
+    assert scraper.parse_times_bulk(column + edge_cases).tolist() == expected
+
+    print(f"Bulk time parsing over {size:,} strings")
+    baseline = best_of(lambda: [uncached(t) for t in column], 1, repeat=3)
+    report("scalar, no cache", baseline, size)
+    report("scalar + LRU cache",
+           best_of(lambda: [scraper.parse_time_to_seconds(t) for t in column], 1, repeat=3),
+           size, baseline)
+    report("parse_times_bulk", best_of(lambda: scraper.parse_times_bulk(column), 1, repeat=3),
+           size, baseline)
+
+
+def bench_rate_archive(count=20_000):
+    """Rating an archive from raw results: per race vs batch engine."""
+    races = synthetic_races(count)
+    model = scraper.get_scoring_model()
+
+    # Unratable, out-of-order and string-position races go through the same paths
+    edge_cases = [[], [{"position": 1, "Time": "1:02:03"}], races[0][::-1],
+                  [{"position": 2, "Time": None}, {"position": None, "Time": "0:05"},
+                   {"position": 1, "Time": "1:02:03"}, {"position": 3, "time": "0:09"}],
+                  [{**result, "position": str(result["position"])} for result in races[1]]]
+    scalar = [scraper.score_gaps(scraper.extract_gaps(r), model) for r in races + edge_cases]
+    scores, stars = scraper.rate_gap_matrix(*scraper.gaps_from_results_many(races + edge_cases),
+                                            model=model)
+    assert scalar == list(zip(scores.tolist(), stars.tolist()))
+
+    print(f"Rating {count:,} races from raw results")
+    baseline = best_of(lambda: [scraper.calculate_rating(r, model) for r in races], 1, repeat=3)
+    report("calculate_rating per race", baseline, count)
+    report("gaps_from_results_many + batch",
+           best_of(lambda: scraper.rate_gap_matrix(*scraper.gaps_from_results_many(races), model=model),
+                   1, repeat=3),
+           count, baseline)
+
+
+def legacy_filter_events(events, today, targets):
+    """The event filter in main() before the pre-filter stage, for comparison."""
+    filtered = []
+    for event in events:
+        series = event.get("series", "")
+        event_date_str = event.get("date", "")
+        series_lower = series.lower() if series else ""
+        if not series or not any(target.lower() in series_lower for target in targets):
+            continue
+        try:
+            event_date = datetime.strptime(event_date_str, "%Y-%m-%d").date()
+            if event_date > today:
+                continue
+        except Exception:
+            continue
+        filtered.append(event)
+    return filtered
+
+
+def bench_event_filter(size=50_000):
+    """Filtering the upstream catalogue: strptime loop vs filter_events."""
+    today = date.today()
+    events, _ = stub_server.synthetic_fixtures(size, seed=2, today=today)
+    targets = list(scraper.get_series_matcher().canonical)
+
+    def cold_filter():
+        # Each daily run starts with empty memo tables
+        scraper.event_date_status.cache_clear()
+        scraper.get_series_matcher().match.cache_clear()
+        return scraper.filter_events(events, today)
+
+    assert legacy_filter_events(events, today, targets) == cold_filter()[0]
+
+    print(f"Filtering a catalogue of {size:,} events")
+    baseline = best_of(lambda: legacy_filter_events(events, today, targets), 1, repeat=3)
+    report("strptime + substring loop", baseline, size)
+    report("filter_events", best_of(cold_filter, 1, repeat=3), size, baseline)
+
+
+BENCHMARKS = {
+    "parse-time": bench_parse_time,
+    "parse-times-bulk": bench_parse_times_bulk,
+    "rate-archive": bench_rate_archive,
+    "event-filter": bench_event_filter,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scraper micro-benchmarks")
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})"
+    )
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
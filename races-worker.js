@@ -0,0 +1,418 @@
+// Race data layer for index.html, run as a dedicated Web Worker so that
+// fetching, JSON parsing, decoding, filtering and sorting stay off the UI
+// thread. The page sends queries and asks for the rows it is about to
+// show; only those races are posted back.
+//
+// Seasons are kept in IndexedDB along with the manifest version they
+// match. On the next visit a stored season is used as is, or brought up
+// to date with the small per-version delta files, and only fetched again
+// when it is too far behind.
+//
+// Messages from the page:
+//   {type: 'init'}
+//   {type: 'query', id, series, category, rating, sortBy, start, end}
+//   {type: 'slice', id, start, end}
+//   {type: 'loadMore'}
+//   {type: 'reload'}                    the data changed; start over
+// Messages to the page:
+//   {type: 'facets', counts}            series/category counts for the filters
+//   {type: 'status', pending, loading}  older seasons not loaded yet
+//   {type: 'changed'}                   more races arrived; query again
+//   {type: 'result', id, total, start, races}
+//   {type: 'error', message}
+
+const DB_NAME = 'cx-race-ratings';
+const DB_STORE = 'seasons';
+
+let races = [];
+// Season shards from manifest.json not fetched yet, newest first, and
+// the manifest they came from with its delta downloads
+let pendingShards = [];
+let source = null;
+let shardLoad = null;
+// Indexes into races: both sort orders and, per facet value, the
+// rows that have it. Shards ship these precomputed.
+let dateOrder = [];
+let ratingOrder = [];
+let facetRows = { series: new Map(), category: new Map(), rating: new Map() };
+let facetCounts = null;
+let bitsetCache = new Map();
+// Rows matching the latest query, in display order
+let currentRows = [];
+let currentId = 0;
+// Bumped on every (re)load so late shards of old data are ignored
+let generation = 0;
+
+function resetData() {
+    races = [];
+    pendingShards = [];
+    source = null;
+    shardLoad = null;
+    dateOrder = [];
+    ratingOrder = [];
+    facetRows = { series: new Map(), category: new Map(), rating: new Map() };
+    facetCounts = null;
+    bitsetCache = new Map();
+}
+
+// Decode a columnar shard: parallel arrays per field, with
+// series/location/category as dictionary indexes, dates as days
+// since the epoch and a null url meaning url_prefix + id + '/'
+function decodeColumns(data) {
+    const cols = data.columns;
+    const dict = data.dictionaries;
+    const epoch = Date.parse(data.epoch);
+    const decoded = new Array(data.count);
+    for (let i = 0; i < data.count; i++) {
+        const day = cols.date[i];
+        decoded[i] = {
+            id: cols.id[i],
+            name: cols.name[i],
+            date: day === null ? '' : new Date(epoch + day * 86400000).toISOString().slice(0, 10),
+            series: dict.series[cols.series[i]],
+            location: dict.location[cols.location[i]],
+            category: dict.category[cols.category[i]],
+            rating: cols.rating[i],
+            score: cols.score[i],
+            url: cols.url[i] === null ? `${data.url_prefix}${cols.id[i]}/` : cols.url[i]
+        };
+    }
+    return decoded;
+}
+
+async function fetchManifest() {
+    try {
+        const response = await fetch('manifest.json');
+        if (response.ok) {
+            const manifest = await response.json();
+            if (manifest.format === 'manifest-v1') return manifest;
+        }
+    } catch (error) {
+        console.warn('Manifest unavailable, falling back to races.json:', error);
+    }
+    return null;
+}
+
+async function fetchShard(shard) {
+    // The content hash busts stale HTTP caches when a shard changes
+    const response = await fetch(`${shard.file}?v=${shard.sha256.slice(0, 12)}`);
+    if (!response.ok) throw new Error(`${shard.file}: HTTP ${response.status}`);
+    return response.json();
+}
+
+// ISO dates compare correctly as strings, newest first
+function byDate(list) {
+    return (a, b) => {
+        const x = list[a].date;
+        const y = list[b].date;
+        return x < y ? 1 : x > y ? -1 : 0;
+    };
+}
+
+function byRating(list) {
+    const compareDate = byDate(list);
+    return (a, b) => (list[b].rating || 0) - (list[a].rating || 0) || compareDate(a, b);
+}
+
+// Merge two row lists that are each sorted by compare
+function mergeOrder(a, b, compare) {
+    const merged = new Array(a.length + b.length);
+    let i = 0, j = 0, k = 0;
+    while (i < a.length && j < b.length) {
+        merged[k++] = compare(b[j], a[i]) < 0 ? b[j++] : a[i++];
+    }
+    while (i < a.length) merged[k++] = a[i++];
+    while (j < b.length) merged[k++] = b[j++];
+    return merged;
+}
+
+function addFacetRows(field, value, rows) {
+    const list = facetRows[field].get(value);
+    if (list) {
+        for (const row of rows) list.push(row);
+    } else {
+        facetRows[field].set(value, rows);
+    }
+}
+
+// Orders and facet rows as precomputed in a shard
+function shardIndexes(data) {
+    const facets = { series: new Map(), category: new Map(), rating: new Map() };
+    for (const field of ['series', 'category']) {
+        data.facets[field].forEach((rows, value) => {
+            facets[field].set(data.dictionaries[field][value], rows);
+        });
+    }
+    for (const [rating, rows] of Object.entries(data.facets.rating)) {
+        facets.rating.set(Number(rating), rows);
+    }
+    return { order: data.order, facets };
+}
+
+// The same indexes built here, for races.json and delta-patched seasons
+function buildIndexes(list) {
+    const rows = list.map((_, row) => row);
+    const facets = { series: new Map(), category: new Map(), rating: new Map() };
+    list.forEach((race, row) => {
+        for (const field of ['series', 'category', 'rating']) {
+            const value = race[field];
+            if (value === undefined || value === null) continue;
+            const matching = facets[field].get(value);
+            if (matching) {
+                matching.push(row);
+            } else {
+                facets[field].set(value, [row]);
+            }
+        }
+    });
+    return { order: { date: rows.slice().sort(byDate(list)), rating: rows.slice().sort(byRating(list)) }, facets };
+}
+
+// Append races with their orders and facet rows, shifted past the races
+// already loaded
+function addRaces(list, indexes) {
+    const base = races.length;
+    const shift = rows => rows.map(row => row + base);
+    races = races.concat(list);
+    dateOrder = mergeOrder(dateOrder, shift(indexes.order.date), byDate(races));
+    ratingOrder = mergeOrder(ratingOrder, shift(indexes.order.rating), byRating(races));
+    for (const field of Object.keys(indexes.facets)) {
+        for (const [value, rows] of indexes.facets[field]) {
+            addFacetRows(field, value, shift(rows));
+        }
+    }
+    bitsetCache.clear();
+}
+
+// IndexedDB helpers; without storage (private mode, quota) every season
+// is simply fetched
+let dbOpen = null;
+
+function openDb() {
+    if (!dbOpen) {
+        dbOpen = new Promise(resolve => {
+            if (typeof indexedDB === 'undefined') return resolve(null);
+            const request = indexedDB.open(DB_NAME, 1);
+            request.onupgradeneeded = () => request.result.createObjectStore(DB_STORE, { keyPath: 'season' });
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(null);
+        });
+    }
+    return dbOpen;
+}
+
+async function storedSeason(season) {
+    const db = await openDb();
+    if (!db) return null;
+    return new Promise(resolve => {
+        const request = db.transaction(DB_STORE).objectStore(DB_STORE).get(season);
+        request.onsuccess = () => resolve(request.result || null);
+        request.onerror = () => resolve(null);
+    });
+}
+
+async function storeSeason(record) {
+    const db = await openDb();
+    if (!db) return;
+    try {
+        db.transaction(DB_STORE, 'readwrite').objectStore(DB_STORE).put(record);
+    } catch (error) {
+        console.warn(`Could not store season ${record.season}:`, error);
+    }
+}
+
+// Deltas from a stored version up to the manifest's, downloaded once and
+// shared by every season stored at that version
+function fetchDeltas(from, fromVersion) {
+    if (!from.deltas.has(fromVersion)) {
+        const versions = [];
+        for (let version = fromVersion + 1; version <= from.manifest.version; version++) {
+            versions.push(version);
+        }
+        from.deltas.set(fromVersion, Promise.all(versions.map(async version => {
+            const response = await fetch(`deltas/delta-${version}.json`);
+            if (!response.ok) throw new Error(`delta ${version}: HTTP ${response.status}`);
+            return response.json();
+        })));
+    }
+    return from.deltas.get(fromVersion);
+}
+
+function applyDeltas(list, season, deltas) {
+    const byId = new Map(list.map(race => [race.id, race]));
+    for (const delta of deltas) {
+        const changes = delta.seasons[season];
+        if (!changes) continue;
+        changes.removed.forEach(id => byId.delete(id));
+        changes.upserts.forEach(race => byId.set(race.id, race));
+    }
+    return [...byId.values()];
+}
+
+// Races of one season with their indexes: from IndexedDB when stored for
+// this version, patched with deltas when the stored copy is recent enough,
+// otherwise fetched as a shard. The shard's race count guards against a
+// stored copy that has drifted.
+async function loadSeason(shard, from) {
+    const manifest = from.manifest;
+    const stored = await storedSeason(shard.season);
+    if (stored && stored.version >= manifest.version && stored.races.length === shard.count) {
+        return stored;
+    }
+    if (stored && stored.version >= manifest.delta_from && stored.version < manifest.version) {
+        try {
+            const list = applyDeltas(stored.races, shard.season, await fetchDeltas(from, stored.version));
+            if (list.length === shard.count) {
+                const record = { season: shard.season, version: manifest.version, races: list, indexes: buildIndexes(list) };
+                storeSeason(record);
+                return record;
+            }
+        } catch (error) {
+            console.warn(`Could not update season ${shard.season} from deltas:`, error);
+        }
+    }
+    const data = await fetchShard(shard);
+    const record = { season: shard.season, version: manifest.version, races: decodeColumns(data), indexes: shardIndexes(data) };
+    storeSeason(record);
+    return record;
+}
+
+// Bitset over races of the rows matching any of the facet values
+function facetBitset(field, values) {
+    const key = `${field}:${values.join('|')}`;
+    let bits = bitsetCache.get(key);
+    if (!bits) {
+        bits = new Uint32Array((races.length + 31) >>> 5);
+        for (const value of values) {
+            for (const row of facetRows[field].get(value) || []) {
+                bits[row >>> 5] |= 1 << (row & 31);
+            }
+        }
+        bitsetCache.set(key, bits);
+    }
+    return bits;
+}
+
+// Intersect the active filters; null when nothing is filtered
+function matchingRows(seriesFilter, categoryFilter, ratingFilter) {
+    const sets = [];
+    if (seriesFilter) sets.push(facetBitset('series', [seriesFilter]));
+    if (categoryFilter) sets.push(facetBitset('category', [categoryFilter]));
+    if (ratingFilter) {
+        const ratings = [...facetRows.rating.keys()].filter(r => r >= ratingFilter).sort();
+        sets.push(facetBitset('rating', ratings));
+    }
+    if (sets.length === 0) return null;
+    if (sets.length === 1) return sets[0];
+    const bits = sets[0].slice();
+    for (const other of sets.slice(1)) {
+        for (let w = 0; w < bits.length; w++) bits[w] &= other[w];
+    }
+    return bits;
+}
+
+// Fetch the next older season; concurrent callers share one request
+function loadNextShard() {
+    if (shardLoad || pendingShards.length === 0) return shardLoad;
+    const shard = pendingShards.shift();
+    const loadGeneration = generation;
+    shardLoad = loadSeason(shard, source).then(record => {
+        if (loadGeneration !== generation) return;
+        addRaces(record.races, record.indexes);
+        shardLoad = null;
+        postFacets();
+        postStatus();
+        postMessage({ type: 'changed' });
+    }, error => {
+        if (loadGeneration !== generation) return;
+        shardLoad = null;
+        postStatus();
+        console.error(`Failed to load season ${shard.season}:`, error);
+    });
+    postStatus();
+    return shardLoad;
+}
+
+async function loadAllShards() {
+    while (pendingShards.length > 0) {
+        await loadNextShard();
+    }
+}
+
+function postStatus() {
+    postMessage({ type: 'status', pending: pendingShards.length, loading: shardLoad !== null });
+}
+
+// Counts across every season come from the manifest, so the
+// options are complete before older shards load
+function postFacets() {
+    const counts = field => facetCounts ? facetCounts[field] :
+        Object.fromEntries([...facetRows[field]].map(([value, rows]) => [value, rows.length]));
+    postMessage({ type: 'facets', counts: { series: counts('series'), category: counts('category') } });
+}
+
+// Fetch the newest season (or races.json) before dropping the current
+// data, so a reload swaps the list in one step
+async function loadRaces() {
+    const manifest = await fetchManifest();
+    if (manifest && manifest.shards.length > 0) {
+        const from = { manifest, deltas: new Map() };
+        const first = await loadSeason(manifest.shards[0], from);
+        generation++;
+        resetData();
+        source = from;
+        pendingShards = manifest.shards.slice(1);
+        facetCounts = manifest.facets;
+        addRaces(first.races, first.indexes);
+    } else {
+        const response = await fetch('races.json');
+        const data = await response.json();
+        const list = Array.isArray(data) ? data : data.races || [];
+        generation++;
+        resetData();
+        addRaces(list, buildIndexes(list));
+    }
+    postFacets();
+    postStatus();
+    postMessage({ type: 'changed' });
+}
+
+function postSlice(id, start, end) {
+    start = Math.max(0, start);
+    end = Math.min(currentRows.length, end);
+    const slice = [];
+    for (let i = start; i < end; i++) slice.push(races[currentRows[i]]);
+    postMessage({ type: 'result', id, total: currentRows.length, start, races: slice });
+}
+
+function query(message) {
+    // A filter or the rating sort needs every season to be correct
+    if ((message.series || message.category || message.rating || message.sortBy === 'rating') && pendingShards.length > 0) {
+        loadAllShards();
+    }
+
+    // Walk the precomputed order, keeping rows in every filter
+    const order = message.sortBy === 'date' ? dateOrder : ratingOrder;
+    const bits = matchingRows(message.series, message.category, message.rating);
+    currentRows = bits ? order.filter(row => bits[row >>> 5] & (1 << (row & 31))) : order;
+    currentId = message.id;
+    postSlice(message.id, message.start, message.end);
+}
+
+onmessage = event => {
+    const message = event.data;
+    if (message.type === 'init' || message.type === 'reload') {
+        loadRaces().catch(error => {
+            console.error('Failed to load races:', error);
+            // A failed reload keeps showing the races already loaded
+            if (message.type === 'init') postMessage({ type: 'error', message: String(error) });
+        });
+    } else if (message.type === 'query') {
+        query(message);
+    } else if (message.type === 'slice') {
+        // Slices for a superseded query are dropped
+        if (message.id === currentId) postSlice(message.id, message.start, message.end);
+    } else if (message.type === 'loadMore') {
+        loadNextShard();
+    }
+};
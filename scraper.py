@@ -4,48 +4,196 @@ Cyclocross Race Ratings Scraper
 Uses parse.bot APIs to fetch race data from cyclocross24.com
 """
 
+import argparse
+import base64
+import gzip
+import hashlib
+import numpy as np
 import requests
 import json
 import os
-from datetime import datetime
-
-# Parse.bot API endpoints
-EVENTS_API = "https://api.parse.bot/scraper/2583ae79-37d8-42c9-bf27-1dc26e005045/get_all_race_events"
-RESULTS_API = "https://api.parse.bot/scraper/2583ae79-37d8-42c9-bf27-1dc26e005045/get_race_results"
-
-# Series we care about
-TARGET_SERIES = [
-    "UCI World Cup",
-    "World Cup",
-    "Superprestige",
-    "X2O Trofee",
-    "X2O",
-    "Exact Cross",
-    "European Championships",
-    "World Championships",
-    "National Championships",
-]
+import random
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from itertools import chain
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Parse.bot API endpoints (override to point at stub_server.py)
+EVENTS_API = os.environ.get(
+    "PARSEBOT_EVENTS_API",
+    "https://api.parse.bot/scraper/2583ae79-37d8-42c9-bf27-1dc26e005045/get_all_race_events"
+)
+RESULTS_API = os.environ.get(
+    "PARSEBOT_RESULTS_API",
+    "https://api.parse.bot/scraper/2583ae79-37d8-42c9-bf27-1dc26e005045/get_race_results"
+)
+
+# Number of results requests to run in parallel
+DEFAULT_JOBS = 8
+
+# Seconds to wait for a parse.bot response
+REQUEST_TIMEOUT = 30
+
+# Requests per second allowed to parse.bot. The limiter halves its rate on
+# every 429 and creeps back up towards the maximum on success.
+DEFAULT_RATE = 5.0
+MIN_RATE = 0.2
+MAX_RATE = 20.0
+RATE_INCREASE = 0.1
+
+# Retries for throttled or failed requests, with exponential backoff
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# On-disk cache of raw results payloads
+CACHE_DIR = os.path.join(".cache", "results")
+
+# Results fetched within this many days of the race may still change
+RECENT_RACE_DAYS = 7
+
+# Hours before a cached result for a recent race is refetched
+DEFAULT_CACHE_TTL_HOURS = 24
+
+# Events that returned no results are rechecked after these many days,
+# then given up on
+NO_RESULTS_RETRY_DAYS = [1, 2, 4, 8]
+NO_RESULTS_FILE = os.path.join(".cache", "no_results.json")
+
+# Catalogue fingerprints and watermark from the last sync
+EVENT_SYNC_FILE = os.path.join(".cache", "event_sync.json")
+
+# Rating formulas; several named models can live side by side
+SCORING_MODELS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scoring_models.json")
+
+# Race records: an append-only JSON Lines store is the source of truth and
+# races.json is generated from it for the site
+RACES_STORE_FILE = "races.jsonl"
+RACES_DB_FILE = "races.db"
+RACES_FILE = "races.json"
+PRETTY_RACES_FILE = "races.pretty.json"
+PUBLISHED_FIELDS = ["id", "name", "date", "series", "location", "category", "rating", "score", "url"]
+
+# The site loads races in season shards (races-2025-26.json) listed in a
+# manifest, newest season first. Shards are columnar: one array per field,
+# repeated strings as indexes into a dictionary, dates as days since the
+# epoch and urls left out when they follow the default cyclocross24 pattern
+MANIFEST_FILE = "manifest.json"
+MANIFEST_FORMAT = "manifest-v1"
+SHARD_PATTERN = re.compile(r"^races-(\d{4}-\d{2}|undated)\.json(\.gz|\.br)?$")
+SEASON_START_MONTH = 7
+
+# Each publish that changes the races bumps the manifest version and
+# writes deltas/delta-<version>.json with the changes since the previous
+# version, so returning browsers can catch up without refetching shards.
+# Only the last DELTA_HISTORY deltas are kept.
+DELTA_DIR = "deltas"
+DELTA_FORMAT = "delta-v1"
+DELTA_PATTERN = re.compile(r"^delta-(\d+)\.json$")
+DELTA_HISTORY = 30
+COLUMNS_FORMAT = "columns-v1"
+DICTIONARY_FIELDS = ["series", "location", "category"]
+# Filters the page offers; shards carry the rows for each value and the
+# manifest the counts across all seasons
+FACET_FIELDS = ["series", "category", "rating"]
+DATE_EPOCH = date(1970, 1, 1)
+RACE_URL_PREFIX = "https://cyclocross24.com/race/"
+
+# Superseded lines allowed in the store, as a fraction of races, before
+# it is compacted
+COMPACT_RATIO = 0.25
+
+# Series we care about: canonical label -> names it appears under upstream
+SERIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "series.json")
+
+
+# Time formats seen in results, besides plain m:ss / h:mm:ss
+SAME_TIME_TOKENS = frozenset(["", "''", "s.t.", "st", "s.t"])
+NON_FINISH_PATTERN = re.compile(r"dn[fs]|dsq|otl|abd|[+-]?\d+\s*laps?", re.IGNORECASE)
+SIGNED_TIME_PATTERN = re.compile(r"([+-]?)(\d+)(?::(\d+))?(?::(\d+))?(?:\.\d*)?")
+
+# Placeholder for unparseable times in bulk-parsed arrays
+TIME_INVALID = np.iinfo(np.int32).min
+# Position values the batch gap builder handles itself; anything else
+# (e.g. "1" or "DNF") is left to extract_gaps
+PLAIN_POSITION_TYPES = {int, float, bool, type(None)}
+NON_FINISH_WORDS = ["dnf", "dns", "dsq", "otl", "abd"]
+
+# Distinct time strings remembered by parse_time_to_seconds
+TIME_CACHE_SIZE = 4096
 
 
 def parse_time_to_seconds(time_str):
     """Convert time string to seconds. Returns None if invalid."""
     if time_str is None:
         return None
+    if not isinstance(time_str, str):
+        time_str = str(time_str)
+    return _parse_time_cached(time_str)
+
+
+@lru_cache(maxsize=TIME_CACHE_SIZE)
+def _parse_time_cached(time_str):
+    """
+    Tokenize one time string. Plain digit forms are handled first, then
+    same-time and non-finisher markers, signed or decimal times, and
+    finally the original parser for anything else.
+    """
+    time_str = time_str.strip()
     
-    time_str = str(time_str).strip()
-    
-    # Handle empty string as same time (0 seconds)
-    if time_str == "":
+    # Handle empty string, '' and s.t. as same time (0 seconds)
+    if time_str in SAME_TIME_TOKENS:
         return 0
     
-    # Handle '' (two single quotes) as same time
-    if time_str == "''":
-        return 0
+    parts = time_str.split(":")
+    if len(parts) == 2:
+        minutes, seconds = parts
+        if minutes.isdecimal() and seconds.isdecimal():
+            return int(minutes) * 60 + int(seconds)
+    elif len(parts) == 3:
+        hours, minutes, seconds = parts
+        if hours.isdecimal() and minutes.isdecimal() and seconds.isdecimal():
+            return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+    elif time_str.isdecimal():
+        return int(time_str)
     
-    # Handle "s.t." (same time)
-    if time_str.lower() in ["s.t.", "st", "s.t"]:
+    if time_str.lower() in SAME_TIME_TOKENS:
         return 0
     
+    # Lap-down riders and non-finishers have no usable gap
+    if NON_FINISH_PATTERN.fullmatch(time_str):
+        return None
+    
+    # "+0:12", "-3", "1:02.5"; the sign applies to the leading field
+    token = SIGNED_TIME_PATTERN.fullmatch(time_str)
+    if token:
+        sign, first, second, third = token.groups()
+        total = -int(first) if sign == "-" else int(first)
+        if third is not None:
+            return total * 3600 + int(second) * 60 + int(third)
+        if second is not None:
+            return total * 60 + int(second)
+        return total
+    
+    return _parse_time_fallback(time_str)
+
+
+def _parse_time_fallback(time_str):
+    """Original parser, kept for strings the tokenizer does not recognise."""
     try:
         if ":" in time_str:
             parts = time_str.split(":")
@@ -55,33 +203,158 @@ def parse_time_to_seconds(time_str):
             elif len(parts) == 3:
                 hours, minutes, seconds = int(parts[0]), int(parts[1]), int(parts[2])
                 return hours * 3600 + minutes * 60 + seconds
+            return None
         else:
             return int(float(time_str))
-    except (ValueError, TypeError):
+    except (ValueError, TypeError, OverflowError):
         return None
 
 
-def calculate_rating(results):
+def parse_times_bulk(time_strs):
     """
-    Calculate excitement rating based on time gaps.
-    Returns a tuple of (score, stars).
+    Parse a whole column of raw time strings into an int32 array of
+    seconds, with TIME_INVALID where parse_time_to_seconds gives None.
+    Times too large for int32 saturate at its limits. Results columns are
+    extremely repetitive, so each distinct string is parsed once by the
+    vectorized tokenizer and the column is rebuilt from that table.
+    """
+    count = len(time_strs)
+    if count == 0:
+        return np.full(0, TIME_INVALID, dtype=np.int32)
+    
+    table = dict.fromkeys(time_strs)
+    table.pop(None, None)
+    distinct = list(table)
+    for time_str, seconds in zip(distinct, _parse_times_vectorized(distinct).tolist()):
+        table[time_str] = seconds
+    table[None] = TIME_INVALID
+    return np.fromiter(map(table.__getitem__, time_strs), dtype=np.int32, count=count)
+
+
+def _parse_times_vectorized(time_strs):
+    """
+    Tokenize a column of time strings (no None) all at once.
+    The strings are scanned as a matrix of code points, one character
+    position at a time, so [+-]h:mm:ss / m:ss / s with optional decimals
+    is parsed for every row together. Rows outside that grammar are
+    matched against the same-time and non-finisher markers, and anything
+    left goes through the scalar parser so results always agree with it.
+    """
+    count = len(time_strs)
+    out = np.full(count, TIME_INVALID, dtype=np.int32)
+    if count == 0:
+        return out
+    
+    text = np.array([t if isinstance(t, str) else str(t) for t in time_strs], dtype=str)
+    if text.dtype.itemsize == 0:
+        text = text.astype("<U1")
+    # One contiguous row of code points per character position
+    columns = np.ascontiguousarray(text.view(np.uint32).reshape(count, -1).T.astype(np.int32))
+    
+    # Surrounding whitespace is rare; only strip when there is some
+    if np.any((columns == ord(" ")) | ((columns >= 9) & (columns <= 13))):
+        text = np.ascontiguousarray(np.char.strip(text))
+        if text.dtype.itemsize == 0:
+            text = text.astype("<U1")
+        columns = np.ascontiguousarray(text.view(np.uint32).reshape(count, -1).T.astype(np.int32))
+    
+    negative = columns[0] == ord("-")
+    signed = negative | (columns[0] == ord("+"))
+    
+    total = np.zeros(count, dtype=np.int64)
+    field = np.zeros(count, dtype=np.int64)
+    field_len = np.zeros(count, dtype=np.int64)
+    colons = np.zeros(count, dtype=np.int64)
+    in_fraction = np.zeros(count, dtype=bool)
+    ok = columns[0] != 0
+    
+    for j, column in enumerate(columns):
+        body = column != 0
+        if j == 0:
+            body &= ~signed
+        digit = body & (column >= ord("0")) & (column <= ord("9"))
+        colon = body & (column == ord(":")) & ~in_fraction
+        dot = body & (column == ord(".")) & ~in_fraction
+        ok &= ~body | digit | colon | dot
+        
+        # Digits extend the current field; decimals are dropped
+        take = digit & ~in_fraction
+        field[take] = field[take] * 10 + (column[take] - ord("0"))
+        field_len += take
+        
+        # A colon closes a field; the sign belongs to the leading one
+        if colon.any():
+            ok &= ~colon | (field_len > 0)
+            lead = np.where(negative & (colons == 0), -field, field)
+            total[colon] = (total[colon] + lead[colon]) * 60
+            colons += colon
+            field[colon] = 0
+            field_len[colon] = 0
+        if dot.any():
+            ok &= ~dot | (field_len > 0)
+            in_fraction |= dot
+    
+    ok &= (field_len > 0) & (field_len <= 9) & (colons <= 2)
+    total += np.where(negative & (colons == 0), -field, field)
+    
+    lowest, highest = TIME_INVALID + 1, np.iinfo(np.int32).max
+    out[ok] = np.clip(total[ok], lowest, highest)
+    
+    # Same-time and non-finisher markers, checked only for the rows left over
+    leftover = np.flatnonzero(~ok)
+    lower = np.char.lower(text[leftover])
+    out[leftover[np.isin(lower, list(SAME_TIME_TOKENS))]] = 0
+    marker = (np.isin(lower, list(SAME_TIME_TOKENS))
+              | np.isin(lower, NON_FINISH_WORDS)
+              | np.char.endswith(lower, "lap")
+              | np.char.endswith(lower, "laps"))
+    
+    # Anything else gets the scalar parser's verdict
+    for i in leftover[~marker]:
+        seconds = parse_time_to_seconds(time_strs[i])
+        if seconds is not None:
+            out[i] = max(lowest, min(highest, seconds))
+    return out
+
+
+def position_key(result):
+    """Sort key for a result row; unplaced riders go to the back."""
+    return result.get("position") or 999
+
+
+def in_position_order(results):
+    """Check whether results are already sorted by position_key."""
+    previous = None
+    for result in results:
+        key = position_key(result)
+        if previous is not None and key < previous:
+            return False
+        previous = key
+    return True
+
+
+def extract_gaps(results):
+    """
+    Extract the time gaps behind the winner, in finishing order.
+    Returns None when there are too few results to rate.
     """
     if not results or len(results) < 2:
-        return 0, 1
+        return None
     
-    # Sort by position
-    sorted_results = sorted(results, key=lambda x: x.get("position") or 999)
+    # Upstream lists are normally in finishing order already
+    if not in_position_order(results):
+        results = sorted(results, key=position_key)
     
     # Extract gaps - position 1 has finish time, others have gaps
     gaps = []
     
-    for result in sorted_results:
+    for result in results:
         pos = result.get("position")
         time_str = result.get("Time") or result.get("time")
         
         if not time_str or not pos:
             continue
-            
+        
         seconds = parse_time_to_seconds(time_str)
         
         if seconds is None:
@@ -94,107 +367,534 @@ def calculate_rating(results):
             # For position 2+, the Time field is the gap
             gaps.append(seconds)
     
+    return gaps
+
+
+def calculate_rating(results, model=None):
+    """
+    Calculate excitement rating based on time gaps.
+    Returns a tuple of (score, stars).
+    """
+    return score_gaps(extract_gaps(results), model)
+
+
+class ScoringModel:
+    """
+    A rating formula compiled from scoring_models.json.
+    Gap buckets become sorted tuples of inclusive upper bounds looked up
+    with bisect; NumPy copies of the same tables serve the batch engine.
+    """
+
+    def __init__(self, name, config):
+        self.name = name
+        self.description = config.get("description", "")
+        
+        self.gap_to_2nd_upto, self.gap_to_2nd_points = self._buckets(config["gap_to_2nd"])
+        self.gap_to_3rd_upto, self.gap_to_3rd_points = self._buckets(config["gap_to_3rd"])
+        
+        close = config["close_finishers"]
+        self.close_within = close["within"]
+        self.close_points = close["points_each"]
+        self.close_max = close["max"]
+        
+        duel = config["duel"]
+        self.duel_max_gap_to_2nd = duel["max_gap_to_2nd"]
+        self.duel_min_gap_to_3rd = duel["min_gap_to_3rd"]
+        self.duel_points = duel["points"]
+        
+        bunch = config["bunch"]
+        self.bunch_steps = bunch["top"] - 1
+        self.bunch_max_step = bunch["max_step"]
+        self.bunch_points = bunch["points_each"]
+        self.bunch_max = bunch["max"]
+        
+        self.star_cutoffs = tuple(config["stars"]["min_score"])
+        if list(self.star_cutoffs) != sorted(self.star_cutoffs):
+            raise ValueError(f"Scoring model {name}: star cut-offs must be ascending")
+        
+        # Lookup tables for the batch engine
+        self.np_gap_to_2nd = (np.array(self.gap_to_2nd_upto), np.array(self.gap_to_2nd_points))
+        self.np_gap_to_3rd = (np.array(self.gap_to_3rd_upto), np.array(self.gap_to_3rd_points))
+        self.np_star_cutoffs = np.array(self.star_cutoffs)
+
+    def _buckets(self, table):
+        upto = tuple(table["upto"])
+        points = tuple(table["points"])
+        if list(upto) != sorted(upto) or len(points) != len(upto) + 1:
+            raise ValueError(
+                f"Scoring model {self.name}: buckets need ascending 'upto' bounds "
+                "and one more 'points' entry than bounds"
+            )
+        return upto, points
+
+    def bucket_points(self, upto, points, gap):
+        """Points for the first bucket whose upper bound is >= gap."""
+        return points[bisect_left(upto, gap)]
+
+    def stars(self, score):
+        """Star rating (1-5) for a score."""
+        return bisect_right(self.star_cutoffs, score) + 1
+
+
+_scoring_models = None
+
+
+def load_scoring_models(path=SCORING_MODELS_FILE):
+    """
+    Load and compile every model in the scoring config.
+    Returns (models, default_name).
+    """
+    with open(path, "r") as f:
+        config = json.load(f)
+    models = {name: ScoringModel(name, spec) for name, spec in config["models"].items()}
+    default_name = config.get("default") or next(iter(models))
+    if default_name not in models:
+        raise ValueError(f"Default scoring model {default_name} is not defined in {path}")
+    return models, default_name
+
+
+def get_scoring_model(name=None):
+    """Return a compiled scoring model by name, or the default one."""
+    global _scoring_models
+    if _scoring_models is None:
+        _scoring_models = load_scoring_models()
+    models, default_name = _scoring_models
+    name = name or default_name
+    if name not in models:
+        raise ValueError(f"Unknown scoring model {name}; available: {', '.join(sorted(models))}")
+    return models[name]
+
+
+def score_gaps(gaps, model=None):
+    """
+    Score a race from its gaps behind the winner (see extract_gaps).
+    Returns a tuple of (score, stars).
+    """
+    if gaps is None:
+        return 0, 1
+    model = model or get_scoring_model()
+    
     gap_to_2nd = gaps[0] if len(gaps) > 0 else None
     gap_to_3rd = gaps[1] if len(gaps) > 1 else None
     
-    # Count riders within 30 seconds (more generous than 10)
-    close_finishers = sum(1 for g in gaps if g <= 30) + 1  # +1 for winner
+    # Count riders within the close-finish window
+    close_finishers = sum(1 for g in gaps if g <= model.close_within) + 1  # +1 for winner
     
     # Calculate score
     score = 0
     
-    # Gap to 2nd (0-50 points) - most important
+    # Gap to 2nd - most important
     if gap_to_2nd is not None:
-        if gap_to_2nd == 0:
-            score += 50  # Same time / sprint finish
-        elif gap_to_2nd <= 3:
-            score += 45
-        elif gap_to_2nd <= 10:
-            score += 35
-        elif gap_to_2nd <= 20:
-            score += 25
-        elif gap_to_2nd <= 30:
-            score += 20
-        elif gap_to_2nd <= 45:
-            score += 15
-        elif gap_to_2nd <= 60:
-            score += 10
-        elif gap_to_2nd <= 90:
-            score += 5
-    
-    # Gap to 3rd (0-30 points)
+        score += model.bucket_points(model.gap_to_2nd_upto, model.gap_to_2nd_points, gap_to_2nd)
+    
+    # Gap to 3rd
     if gap_to_3rd is not None:
-        if gap_to_3rd <= 5:
-            score += 30
-        elif gap_to_3rd <= 15:
-            score += 25
-        elif gap_to_3rd <= 30:
-            score += 20
-        elif gap_to_3rd <= 60:
-            score += 15
-        elif gap_to_3rd <= 120:
-            score += 10
-        elif gap_to_3rd <= 180:
-            score += 5
-    
-    # Close finishers bonus (0-20 points) - riders within 30 seconds
-    score += min(close_finishers * 5, 20)
+        score += model.bucket_points(model.gap_to_3rd_upto, model.gap_to_3rd_points, gap_to_3rd)
+    
+    # Close finishers bonus
+    score += min(close_finishers * model.close_points, model.close_max)
     
     # Duel bonus: if 1st and 2nd are close but 3rd is far back, it was a battle
     if gap_to_2nd is not None and gap_to_3rd is not None:
-        if gap_to_2nd <= 30 and gap_to_3rd >= 60:
-            score += 15  # Two-rider duel bonus
+        if gap_to_2nd <= model.duel_max_gap_to_2nd and gap_to_3rd >= model.duel_min_gap_to_3rd:
+            score += model.duel_points
     
-    # Bunch finish bonus: count small gaps between consecutive positions in top 20
-    # If many riders are separated by <5 seconds, it was bunch racing
+    # Bunch finish bonus: count small gaps between consecutive positions
+    # at the front. If many riders are separated by a few seconds, it was
+    # bunch racing
     bunch_gaps = 0
-    for i in range(min(len(gaps) - 1, 19)):  # Top 20 means up to 19 gaps
-        gap_between = gaps[i+1] - gaps[i] if i+1 < len(gaps) else 999
-        if gap_between <= 5:
+    for i in range(min(len(gaps) - 1, model.bunch_steps)):
+        if gaps[i+1] - gaps[i] <= model.bunch_max_step:
             bunch_gaps += 1
+    score += min(bunch_gaps * model.bunch_points, model.bunch_max)
     
-    # Award points for bunch racing (up to 15 points)
-    score += min(bunch_gaps * 3, 15)
-    
-    # Convert to stars (Middelkerke = 107 as 5-star benchmark)
-    if score >= 107:
-        stars = 5
-    elif score >= 80:
-        stars = 4
-    elif score >= 55:
-        stars = 3
-    elif score >= 35:
-        stars = 2
+    return score, model.stars(score)
+
+
+def pack_gaps(gap_arrays):
+    """
+    Pack per-race gap lists into a zero-padded matrix.
+    Returns (matrix, lengths, valid) where valid is False for races that
+    had too few results to rate (gaps of None).
+    """
+    valid = np.array([g is not None for g in gap_arrays], dtype=bool)
+    lengths = np.array([len(g) if g is not None else 0 for g in gap_arrays], dtype=np.int64)
+    width = int(lengths.max()) if len(lengths) else 0
+    matrix = np.zeros((len(gap_arrays), max(width, 2)), dtype=np.int64)
+    
+    # Scatter every gap into place in one assignment
+    total = int(lengths.sum())
+    flat = np.fromiter(chain.from_iterable(g for g in gap_arrays if g), dtype=np.int64, count=total)
+    rows = np.repeat(np.arange(len(gap_arrays)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    cols = np.arange(total) - np.repeat(starts, lengths)
+    matrix[rows, cols] = flat
+    return matrix, lengths, valid
+
+
+def gaps_from_results_many(results_lists):
+    """
+    Build a padded gap matrix straight from many races' raw results,
+    matching extract_gaps row by row. Every time string in the batch is
+    parsed with one parse_times_bulk call. Races with a position that is
+    not a plain number (e.g. "1" or "DNF") go through extract_gaps itself,
+    since those compare differently from the numeric masks used here.
+    Returns (matrix, lengths, valid) like pack_gaps.
+    """
+    race_count = len(results_lists)
+    valid = np.array([bool(r) and len(r) >= 2 for r in results_lists], dtype=bool)
+    ratable = [results_lists[i] for i in np.flatnonzero(valid)]
+    
+    race_index = np.repeat(np.flatnonzero(valid), [len(r) for r in ratable])
+    rows = [result for results in ratable for result in results]
+    raw_positions = [result.get("position") for result in rows]
+    
+    fallback = {}
+    if not set(map(type, raw_positions)) <= PLAIN_POSITION_TYPES:
+        odd = np.fromiter((type(p) not in PLAIN_POSITION_TYPES for p in raw_positions),
+                          dtype=bool, count=len(rows))
+        for i in np.unique(race_index[odd]).tolist():
+            fallback[i] = extract_gaps(results_lists[i])
+        plain = ~np.isin(race_index, list(fallback))
+        race_index = race_index[plain]
+        rows = [result for result, keep in zip(rows, plain.tolist()) if keep]
+        raw_positions = [p for p, keep in zip(raw_positions, plain.tolist()) if keep]
+    
+    positions = np.fromiter((p or 0 for p in raw_positions), dtype=np.float64, count=len(rows))
+    seconds = parse_times_bulk([result.get("Time") or result.get("time") or None for result in rows])
+    
+    # Same order as extract_gaps: stable sort by position within each race,
+    # unplaced riders last. Upstream lists are normally in order already.
+    keys = np.where(positions == 0, 999, positions)
+    same_race = race_index[1:] == race_index[:-1]
+    if np.any(same_race & (keys[1:] < keys[:-1])):
+        order = np.lexsort((keys, race_index))
     else:
-        stars = 1
+        order = np.arange(len(rows))
+    
+    # The winner and unplaced riders carry no gap
+    placed = (positions != 0) & (positions != 1)
+    keep = order[placed[order] & (seconds[order] != TIME_INVALID)]
+    
+    rows = race_index[keep]
+    lengths = np.bincount(rows, minlength=race_count).astype(np.int64)
+    starts = np.cumsum(lengths) - lengths
+    cols = np.arange(len(rows)) - starts[rows]
+    for i, gaps in fallback.items():
+        lengths[i] = len(gaps)
+    width = int(lengths.max()) if race_count else 0
+    matrix = np.zeros((race_count, max(width, 2)), dtype=np.int64)
+    matrix[rows, cols] = seconds[keep]
+    
+    # Clipped to the int32 range like the bulk-parsed times
+    lowest, highest = TIME_INVALID + 1, np.iinfo(np.int32).max
+    for i, gaps in fallback.items():
+        matrix[i, :len(gaps)] = [min(max(gap, lowest), highest) for gap in gaps]
+    return matrix, lengths, valid
+
+
+def rate_gap_matrix(matrix, lengths, valid=None, model=None):
+    """
+    Score many races at once from a padded gap matrix.
+    Returns (scores, stars) arrays matching score_gaps row by row.
+    """
+    model = model or get_scoring_model()
+    n, width = matrix.shape
+    columns = np.arange(width)
+    present = columns[None, :] < lengths[:, None]
+    
+    gap_to_2nd = matrix[:, 0]
+    gap_to_3rd = matrix[:, 1]
+    has_2nd = lengths > 0
+    has_3rd = lengths > 1
+    
+    # Gap buckets: searchsorted(side="left") is bisect_left per element
+    upto, points = model.np_gap_to_2nd
+    score = np.where(has_2nd, points[np.searchsorted(upto, gap_to_2nd, side="left")], 0)
+    upto, points = model.np_gap_to_3rd
+    score += np.where(has_3rd, points[np.searchsorted(upto, gap_to_3rd, side="left")], 0)
+    
+    # Close finishers bonus
+    close_finishers = np.count_nonzero(present & (matrix <= model.close_within), axis=1) + 1
+    score += np.minimum(close_finishers * model.close_points, model.close_max)
+    
+    # Duel bonus
+    duel = (has_3rd
+            & (gap_to_2nd <= model.duel_max_gap_to_2nd)
+            & (gap_to_3rd >= model.duel_min_gap_to_3rd))
+    score += np.where(duel, model.duel_points, 0)
+    
+    # Bunch finish bonus over the first consecutive gaps
+    span = max(0, min(width - 1, model.bunch_steps))
+    steps = matrix[:, 1:span + 1] - matrix[:, :span]
+    counted = columns[None, :span] < (lengths[:, None] - 1)
+    bunch_gaps = np.count_nonzero(counted & (steps <= model.bunch_max_step), axis=1)
+    score += np.minimum(bunch_gaps * model.bunch_points, model.bunch_max)
     
+    stars = np.searchsorted(model.np_star_cutoffs, score, side="right") + 1
+    
+    if valid is not None:
+        score = np.where(valid, score, 0)
+        stars = np.where(valid, stars, 1)
     return score, stars
 
 
+def rate_many(gap_arrays, model=None):
+    """
+    Batch version of score_gaps for re-rating an archive.
+    Takes a list of gap lists (None for unratable races) and returns
+    (scores, stars) NumPy arrays identical to the scalar results.
+    """
+    if len(gap_arrays) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return rate_gap_matrix(*pack_gaps(gap_arrays), model=model)
+
+
+def rate_many_models(gap_arrays, models):
+    """
+    Score the same races under several models, packing the gaps once.
+    Returns {model name: (scores, stars)}.
+    """
+    if len(gap_arrays) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return {model.name: (empty, empty) for model in models}
+    packed = pack_gaps(gap_arrays)
+    return {model.name: rate_gap_matrix(*packed, model=model) for model in models}
+
+
+def encode_gaps(gaps):
+    """
+    Pack a race's gaps as base64 little-endian int16 so it can be re-rated
+    offline. The whole field is kept, since "s.t." far down the order still
+    counts as a close finisher. Gaps are clipped to the int16 range, far
+    beyond any scoring bucket.
+    """
+    if gaps is None:
+        return None
+    packed = np.clip(np.asarray(gaps, dtype=np.int64), -32768, 32767)
+    return base64.b64encode(packed.astype("<i2").tobytes()).decode("ascii")
+
+
+def decode_gaps(encoded):
+    """Unpack a gap vector written by encode_gaps."""
+    if encoded is None:
+        return None
+    return np.frombuffer(base64.b64decode(encoded), dtype="<i2").astype(np.int64).tolist()
+
+
+class SeriesMatcher:
+    """
+    Matches upstream series names against the target list in one pass.
+    All aliases are compiled into a single case-insensitive regex, longest
+    first so "UCI World Cup" wins over "World Cup", and results are
+    memoized per distinct series string.
+    """
+
+    def __init__(self, aliases):
+        self.canonical = {}
+        for canonical, names in aliases.items():
+            for name in names:
+                self.canonical[name.lower()] = canonical
+        pattern = "|".join(re.escape(name) for name in sorted(self.canonical, key=len, reverse=True))
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        self.match = lru_cache(maxsize=None)(self._match)
+
+    def _match(self, series_name):
+        """Return the canonical series for series_name, or None."""
+        if not series_name:
+            return None
+        found = self.regex.search(series_name)
+        return self.canonical[found.group(0).lower()] if found else None
+
+
+_series_matcher = None
+
+
+def get_series_matcher(path=SERIES_FILE):
+    """Return the series matcher, compiling series.json on first use."""
+    global _series_matcher
+    if _series_matcher is None:
+        with open(path, "r") as f:
+            _series_matcher = SeriesMatcher(json.load(f))
+    return _series_matcher
+
+
 def matches_target_series(series_name):
     """Check if the series matches our targets."""
-    if not series_name:
-        return False
-    series_lower = series_name.lower()
-    for target in TARGET_SERIES:
-        if target.lower() in series_lower:
-            return True
-    return False
+    return get_series_matcher().match(series_name) is not None
+
 
+def canonical_series(series_name):
+    """Normalize a series name to its canonical label, if it is a target."""
+    return get_series_matcher().match(series_name) or series_name
 
-def get_race_events():
+
+def parse_retry_after(value):
+    """Convert a Retry-After header (seconds or HTTP date) to seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every parse.bot request.
+    The rate adapts to the server: it is halved on each throttled response
+    and raised slowly after each success. A Retry-After pauses all workers.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, min_rate=MIN_RATE, max_rate=MAX_RATE):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max(rate, max_rate)
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self.throttle_time = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        burst = max(1.0, self.rate)
+        self.tokens = min(burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            self.wait(wait)
+
+    def wait(self, seconds):
+        """Sleep on behalf of the limiter and count it as throttle time."""
+        time.sleep(seconds)
+        with self._lock:
+            self.throttle_time += seconds
+
+    def on_success(self):
+        """Raise the rate a little after a request goes through."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + RATE_INCREASE)
+
+    def on_throttle(self, retry_after=None):
+        """Slow down after a 429, pausing everyone for Retry-After seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self.throttled += 1
+            self.tokens = 0.0
+            # Workers throttled by the same burst only slow things down once
+            if now - self._last_decrease >= 1.0:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._last_decrease = now
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
+class ParseBotClient:
+    """
+    Shared HTTP client for the parse.bot API.
+    Owns one pooled keep-alive session so every request reuses the same
+    TLS connections and prebuilt auth headers.
+    """
+
+    def __init__(self, api_key=None, pool_size=DEFAULT_JOBS, timeout=REQUEST_TIMEOUT,
+                 limiter=None, max_retries=MAX_RETRIES, events_url=None, results_url=None):
+        if api_key is None:
+            api_key = os.environ.get("PARSEBOT_API_KEY", "")
+        self.api_key = api_key
+        self.events_url = events_url or EVENTS_API
+        self.results_url = results_url or RESULTS_API
+        self.timeout = timeout
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(1, pool_size))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+        if api_key:
+            self.session.headers.update({
+                "Authorization": f"Bearer {api_key}",
+                "x-api-key": api_key
+            })
+
+    def post(self, url, payload):
+        """
+        POST a JSON payload and return the decoded JSON response.
+        Throttled, failed and timed-out requests are retried with
+        exponential backoff and jitter before the error is raised.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            retry_after = None
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    response.raise_for_status()
+                    self.limiter.on_success()
+                    return response.json()
+                
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status_code == 429 or retry_after is not None:
+                    self.limiter.on_throttle(retry_after)
+            
+            # Retry-After is enforced by the limiter; otherwise back off
+            if retry_after is None:
+                backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+                self.limiter.wait(random.uniform(0, backoff))
+
+    def close(self):
+        """Release pooled connections."""
+        self.session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide parse.bot client, creating it on first use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = ParseBotClient()
+        return _default_client
+
+
+def get_race_events(client=None):
     """Fetch list of race events from parse.bot API."""
     print("Fetching race events...")
-    api_key = os.environ.get("PARSEBOT_API_KEY", "")
-    print(f"API key present: {bool(api_key)}, length: {len(api_key)}")
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "x-api-key": api_key
-    } if api_key else {}
+    client = client or get_client()
+    print(f"API key present: {bool(client.api_key)}, length: {len(client.api_key)}")
     try:
-        response = requests.post(EVENTS_API, json={}, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+        data = client.post(client.events_url, {})
         events = data.get("events", [])
         print(f"Found {len(events)} total events")
         return events
@@ -203,22 +903,11 @@ def get_race_events():
         return []
 
 
-def get_race_results(event_id):
+def get_race_results(event_id, client=None):
     """Fetch results for a specific race from parse.bot API."""
-    api_key = os.environ.get("PARSEBOT_API_KEY", "")
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "x-api-key": api_key
-    } if api_key else {}
+    client = client or get_client()
     try:
-        response = requests.post(
-            RESULTS_API,
-            json={"event_id": event_id},
-            headers=headers,
-            timeout=30
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = client.post(client.results_url, {"event_id": event_id})
         
         # Check we have categories
         categories = data.get("categories", [])
@@ -231,29 +920,718 @@ def get_race_results(event_id):
         return None
 
 
-def load_existing_races():
-    """Load existing races.json if it exists."""
-    if os.path.exists("races.json"):
+class ResultsCache:
+    """
+    On-disk cache of raw get_race_results payloads, one JSON file per event.
+    Results fetched more than RECENT_RACE_DAYS after the race never expire;
+    results for recent races are refetched once they are older than the TTL.
+    """
+
+    def __init__(self, directory=CACHE_DIR, ttl_hours=DEFAULT_CACHE_TTL_HOURS, enabled=True):
+        self.directory = directory
+        self.ttl = timedelta(hours=ttl_hours)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        if enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, event_id):
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(event_id))
+        return os.path.join(self.directory, f"{safe_id}.json")
+
+    def _is_fresh(self, entry, now):
+        """Check whether a cached entry can still be served."""
+        try:
+            fetched_at = datetime.fromisoformat(entry["fetched_at"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        try:
+            race_date = date.fromisoformat(entry.get("event_date") or "")
+        except ValueError:
+            race_date = None
+        
+        # Results fetched well after the race are final
+        if race_date and (fetched_at.date() - race_date).days >= RECENT_RACE_DAYS:
+            return True
+        return now - fetched_at < self.ttl
+
+    def get(self, event_id, allow_stale=False):
+        """Return the cached payload for event_id, or None on a miss."""
+        if not self.enabled:
+            return None
         try:
-            with open("races.json", "r") as f:
+            with open(self._path(event_id), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        
+        if entry and (allow_stale or self._is_fresh(entry, datetime.now())):
+            self.hits += 1
+            return entry.get("payload")
+        
+        self.misses += 1
+        return None
+
+    def put(self, event_id, payload, event_date=""):
+        """Store a payload for event_id."""
+        if not self.enabled:
+            return
+        entry = {
+            "event_id": event_id,
+            "event_date": event_date,
+            "fetched_at": datetime.now().isoformat(timespec="seconds"),
+            "payload": payload
+        }
+        path = self._path(event_id)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"  Warning: could not cache results for {event_id}: {e}")
+
+
+class NoResultsCache:
+    """
+    Remembers events that returned no results so the daily run does not
+    refetch them every time. Each further empty response pushes the next
+    check back along NO_RESULTS_RETRY_DAYS; after the last step the event
+    is given up on.
+    """
+
+    def __init__(self, path=NO_RESULTS_FILE, enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self.entries = {}
+        self.skipped = 0
+        if enabled and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self.entries = data
+            except Exception as e:
+                print(f"Warning: Could not load {path}: {e}")
+
+    def should_fetch(self, event_id, today=None):
+        """Check whether an event is due for another results request."""
+        entry = self.entries.get(str(event_id)) if self.enabled else None
+        if not entry:
+            return True
+        
+        attempts = entry.get("attempts", 0)
+        if attempts > len(NO_RESULTS_RETRY_DAYS):
+            return False
+        
+        today = today or date.today()
+        try:
+            last_checked = date.fromisoformat(entry.get("last_checked", ""))
+        except ValueError:
+            return True
+        wait = NO_RESULTS_RETRY_DAYS[max(attempts, 1) - 1]
+        return (today - last_checked).days >= wait
+
+    def record_empty(self, event_id, today=None):
+        """Record another request for event_id that returned no results."""
+        if not self.enabled:
+            return
+        today = (today or date.today()).isoformat()
+        entry = self.entries.setdefault(str(event_id), {"first_seen": today, "attempts": 0})
+        entry["attempts"] += 1
+        entry["last_checked"] = today
+
+    def record_found(self, event_id):
+        """Forget an event once it has produced results."""
+        self.entries.pop(str(event_id), None)
+
+    def save(self):
+        """Write the no-results log back to disk."""
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+
+def event_fingerprint(event):
+    """Short stable hash of an event's catalogue entry."""
+    encoded = json.dumps(event, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+def series_config_hash(path=SERIES_FILE):
+    """Hash of the series.json contents, or None when it cannot be read."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+class EventSyncState:
+    """
+    Watermark for incremental event discovery.
+    Keeps a fingerprint of every catalogue entry seen and the date the last
+    sync covered, so a run only has to look at events that are new, changed,
+    or have moved into the past since then. Events rejected as outside the
+    target series are never revisited, so an edit to series.json since the
+    last sync makes the next run a full one.
+    """
+
+    def __init__(self, path=EVENT_SYNC_FILE, enabled=True, series_path=SERIES_FILE):
+        self.path = path
+        self.enabled = enabled
+        self.synced_through = None
+        self.catalogue_hash = None
+        self.series_hash = series_config_hash(series_path)
+        self.series_changed = False
+        self.fingerprints = {}
+        self._pending = None
+        if enabled and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+                self.synced_through = data.get("synced_through")
+                self.catalogue_hash = data.get("catalogue_hash")
+                self.fingerprints = data.get("fingerprints", {})
+                self.series_changed = data.get("series_hash") != self.series_hash
+            except Exception as e:
+                print(f"Warning: Could not load {path}: {e}")
+
+    def select(self, events, today, recheck_ids=()):
+        """
+        Return the events that need looking at this run, in catalogue order.
+        recheck_ids are always included (e.g. events awaiting a retry).
+        """
+        fingerprints = {str(e.get("event_id")): event_fingerprint(e) for e in events}
+        catalogue_hash = hashlib.sha1(
+            json.dumps(fingerprints, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        self._pending = (today.isoformat(), catalogue_hash, fingerprints)
+        
+        if not self.enabled or not self.synced_through or self.series_changed:
+            return list(events)
+        if catalogue_hash == self.catalogue_hash and self.synced_through >= today.isoformat() and not recheck_ids:
+            return []
+        
+        recheck_ids = {str(i) for i in recheck_ids}
+        selected = []
+        for event in events:
+            event_id = str(event.get("event_id"))
+            if (fingerprints[event_id] != self.fingerprints.get(event_id)
+                    or event_id in recheck_ids
+                    or event.get("date", "") > self.synced_through):
+                selected.append(event)
+        return selected
+
+    def save(self):
+        """Advance the watermark to the catalogue seen by the last select()."""
+        if not self.enabled or self._pending is None:
+            return
+        synced_through, catalogue_hash, fingerprints = self._pending
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({
+                "synced_through": synced_through,
+                "catalogue_hash": catalogue_hash,
+                "series_hash": self.series_hash,
+                "fingerprints": fingerprints
+            }, f)
+
+
+class RaceStore:
+    """
+    Append-only JSON Lines store of rated races; the source of truth.
+    Each line is one race record and a later line for the same id replaces
+    an earlier one. The file is compacted to one line per race once
+    superseded lines make up more than COMPACT_RATIO of it.
+    """
+
+    def __init__(self, path=RACES_STORE_FILE, legacy_path=RACES_FILE):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.lines = 0
+        self._races = None
+
+    def load(self):
+        """Return the current version of every race, in first-seen order."""
+        if self._races is None:
+            self._races = {r.get("id"): r for r in self._read()}
+        return list(self._races.values())
+
+    def _read(self):
+        # An empty store has nothing to lose, so seed it from races.json too
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return self._migrate()
+        
+        races = []
+        self.lines = 0
+        with open(self.path, "r") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    races.append(json.loads(line))
+                except ValueError as e:
+                    print(f"Warning: skipping bad line {number} in {self.path}: {e}")
+                    continue
+                self.lines += 1
+        return races
+
+    def _migrate(self):
+        """Seed a missing or empty store from a races.json written before it."""
+        races = load_published_races(self.legacy_path)
+        if races:
+            print(f"Migrating {len(races)} races from {self.legacy_path} to {self.path}")
+            self._write(races)
+        return races
+
+    def ids(self):
+        """Set of stored race ids."""
+        self.load()
+        return set(self._races)
+
+    def contains(self, event_id):
+        """Check whether a race id is stored."""
+        self.load()
+        return event_id in self._races
+
+    def count(self):
+        """Number of stored races."""
+        self.load()
+        return len(self._races)
+
+    def add(self, races):
+        """Append new or updated race records, compacting when due."""
+        if not races:
+            return
+        self.load()
+        with open(self.path, "a") as f:
+            for race in races:
+                f.write(json.dumps(race, separators=(",", ":")) + "\n")
+                self._races[race.get("id")] = race
+        self.lines += len(races)
+        
+        if self.lines > max(len(self._races), 1) * (1 + COMPACT_RATIO):
+            print(f"Compacting {self.path}")
+            self._write(list(self._races.values()))
+
+    def replace_all(self, races):
+        """Store exactly these races, rewriting the file."""
+        self._races = {r.get("id"): r for r in races}
+        self._write(races)
+
+    def _write(self, races):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            for race in races:
+                f.write(json.dumps(race, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.path)
+        self.lines = len(races)
+
+    def publish(self, path=RACES_FILE, pretty=False):
+        """Regenerate races.json from the store."""
+        publish_races(self.load(), path, pretty)
+
+    def close(self):
+        """Nothing to release; the file is only open while writing."""
+
+
+class SqliteRaceStore:
+    """
+    Optional SQLite backend for the race archive, with the same interface
+    as RaceStore. Races are keyed by event id and indexed on date, series,
+    category and rating, so dedupe is an indexed lookup. Event ids keep
+    their upstream type (numbers stay numbers).
+    """
+
+    COLUMNS = PUBLISHED_FIELDS + ["model", "gaps"]
+
+    def __init__(self, path=RACES_DB_FILE):
+        self.path = path
+        is_new = not os.path.exists(path)
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS races (
+                id PRIMARY KEY,
+                name TEXT,
+                date TEXT,
+                series TEXT,
+                location TEXT,
+                category TEXT,
+                rating INTEGER,
+                score INTEGER,
+                url TEXT,
+                model TEXT,
+                gaps TEXT
+            );
+            CREATE INDEX IF NOT EXISTS races_date ON races (date);
+            CREATE INDEX IF NOT EXISTS races_series ON races (series, date);
+            CREATE INDEX IF NOT EXISTS races_category ON races (category, date);
+            CREATE INDEX IF NOT EXISTS races_rating ON races (rating, date);
+        """)
+        if is_new:
+            self._migrate()
+
+    def _migrate(self):
+        """Seed a new database from the JSON Lines store or races.json."""
+        if os.path.exists(RACES_STORE_FILE):
+            races = RaceStore().load()
+        else:
+            races = load_published_races()
+        if races:
+            print(f"Migrating {len(races)} races into {self.path}")
+            self.add(races)
+
+    def _row(self, race):
+        # The id column has no type, so upstream ids keep their type
+        return [race.get(column) for column in self.COLUMNS]
+
+    def load(self):
+        """Return every race, in first-seen order."""
+        rows = self.db.execute("SELECT * FROM races ORDER BY rowid")
+        return [{key: row[key] for key in row.keys() if row[key] is not None} for row in rows]
+
+    def ids(self):
+        """Set of stored race ids."""
+        return {row[0] for row in self.db.execute("SELECT id FROM races")}
+
+    def contains(self, event_id):
+        """Indexed lookup for a single race id."""
+        found = self.db.execute("SELECT 1 FROM races WHERE id = ?", (event_id,))
+        return found.fetchone() is not None
+
+    def count(self):
+        """Number of stored races."""
+        return self.db.execute("SELECT COUNT(*) FROM races").fetchone()[0]
+
+    def add(self, races):
+        """Insert or update race records in one transaction."""
+        if not races:
+            return
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in self.COLUMNS[1:])
+        # Updated races keep their rowid, so the order matches the JSON Lines store
+        with self.db:
+            self.db.executemany(
+                f"INSERT INTO races ({', '.join(self.COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT (id) DO UPDATE SET {updates}",
+                [self._row(race) for race in races]
+            )
+
+    def replace_all(self, races):
+        """Store exactly these races."""
+        with self.db:
+            self.db.execute("DELETE FROM races")
+            self.add(races)
+
+    def publish(self, path=RACES_FILE, pretty=False):
+        """Export the same races.json the site expects."""
+        columns = ", ".join(PUBLISHED_FIELDS)
+        rows = self.db.execute(f"SELECT {columns} FROM races ORDER BY rowid")
+        publish_races([{key: row[key] for key in row.keys() if row[key] is not None} for row in rows], path, pretty)
+
+    def close(self):
+        """Close the database connection."""
+        self.db.close()
+
+
+def open_race_store(backend="jsonl"):
+    """Open the race archive with the chosen backend."""
+    if backend == "sqlite":
+        return SqliteRaceStore()
+    return RaceStore()
+
+
+def load_published_races(path=RACES_FILE):
+    """Load a published races.json if it exists."""
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
                 data = json.load(f)
                 # Ensure it's a list of dictionaries
                 if isinstance(data, list) and all(isinstance(r, dict) for r in data):
                     return data
                 else:
-                    print("Warning: races.json has invalid format, starting fresh")
+                    print(f"Warning: {path} has invalid format, starting fresh")
                     return []
         except Exception as e:
-            print(f"Warning: Could not load races.json: {e}")
+            print(f"Warning: Could not load {path}: {e}")
             pass
     return []
 
 
-def save_races(races):
-    """Save races to races.json."""
-    with open("races.json", "w") as f:
-        json.dump(races, f, indent=2)
-    print(f"Saved {len(races)} races to races.json")
+def write_artefact(path, data):
+    """Atomically write bytes to path, returning the size written."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def date_offset(date_str):
+    """Days from DATE_EPOCH to an ISO date, or None if it does not parse."""
+    try:
+        return (date.fromisoformat(date_str) - DATE_EPOCH).days
+    except (TypeError, ValueError):
+        return None
+
+
+def columnar_payload(published):
+    """
+    Encode published race records as parallel arrays. Series, location and
+    category become indexes into per-field dictionaries, dates become day
+    offsets from DATE_EPOCH and urls are null when they can be rebuilt
+    from the id. Missing values are null.
+    """
+    columns = {field: [] for field in PUBLISHED_FIELDS}
+    dictionaries = {field: {} for field in DICTIONARY_FIELDS}
+    
+    for race in published:
+        for field in PUBLISHED_FIELDS:
+            value = race.get(field)
+            if field in dictionaries and value is not None:
+                value = dictionaries[field].setdefault(value, len(dictionaries[field]))
+            elif field == "date":
+                value = date_offset(value)
+            elif field == "url" and value == f"{RACE_URL_PREFIX}{race.get('id')}/":
+                value = None
+            columns[field].append(value)
+    
+    return {
+        "format": COLUMNS_FORMAT,
+        "count": len(published),
+        "epoch": DATE_EPOCH.isoformat(),
+        "url_prefix": RACE_URL_PREFIX,
+        "dictionaries": {field: list(values) for field, values in dictionaries.items()},
+        "columns": columns,
+        **race_indexes(columns, len(dictionaries["series"]), len(dictionaries["category"]))
+    }
+
+
+def race_indexes(columns, series_count, category_count):
+    """
+    Precompute what the page needs to filter and sort without scanning:
+    row permutations for date order (newest first) and rating-then-date
+    order, and for each facet value the ascending rows that have it.
+    Series and category facets are lists aligned with their dictionaries;
+    rating facets are keyed by star count.
+    """
+    rows = range(len(columns["id"]))
+    days = [-1 if day is None else day for day in columns["date"]]
+    date_order = sorted(rows, key=days.__getitem__, reverse=True)
+    rating_order = sorted(date_order, key=lambda row: columns["rating"][row] or 0, reverse=True)
+    
+    facets = {
+        "series": [[] for _ in range(series_count)],
+        "category": [[] for _ in range(category_count)],
+        "rating": {}
+    }
+    for row in rows:
+        for field in FACET_FIELDS:
+            value = columns[field][row]
+            if value is None:
+                continue
+            if field == "rating":
+                facets["rating"].setdefault(str(value), []).append(row)
+            else:
+                facets[field][value].append(row)
+    
+    return {"order": {"date": date_order, "rating": rating_order}, "facets": facets}
+
+
+def facet_counts(published):
+    """Races per series, category and rating across the whole archive."""
+    counts = {field: Counter() for field in FACET_FIELDS}
+    for race in published:
+        for field in FACET_FIELDS:
+            if race.get(field) is not None:
+                counts[field][str(race[field])] += 1
+    return {field: dict(sorted(counter.items())) for field, counter in counts.items()}
+
+
+def compressed_artefacts(path, data):
+    """The file itself plus its precompressed .gz and (with brotli) .br siblings."""
+    # mtime=0 keeps the gzip bytes identical when the races are unchanged
+    artefacts = [(path, data), (f"{path}.gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        artefacts.append((f"{path}.br", brotli.compress(data, quality=11)))
+    return artefacts
+
+
+def season_of(date_str):
+    """Cyclocross season label for an ISO date, e.g. 2025-11-02 -> 2025-26."""
+    offset = date_offset(date_str)
+    if offset is None:
+        return "undated"
+    day = DATE_EPOCH + timedelta(days=offset)
+    start = day.year if day.month >= SEASON_START_MONTH else day.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+def shard_races(published):
+    """
+    Split published races (newest first) into columnar season shards.
+    Returns the manifest and a list of (file name, bytes) shards.
+    """
+    seasons = {}
+    for race in published:
+        seasons.setdefault(season_of(race.get("date")), []).append(race)
+    
+    shards = []
+    entries = []
+    # Newest season first, undated races last
+    order = sorted((s for s in seasons if s != "undated"), reverse=True)
+    if "undated" in seasons:
+        order.append("undated")
+    for season in order:
+        season_races = seasons[season]
+        data = json.dumps(columnar_payload(season_races), separators=(",", ":")).encode("utf-8")
+        name = f"races-{season}.json"
+        dates = [race["date"] for race in season_races if race.get("date")]
+        shards.append((name, data))
+        entries.append({
+            "season": season,
+            "file": name,
+            "count": len(season_races),
+            "first_date": min(dates) if dates else None,
+            "last_date": max(dates) if dates else None,
+            "sha256": hashlib.sha256(data).hexdigest()
+        })
+    
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "count": len(published),
+        "facets": facet_counts(published),
+        "shards": entries
+    }
+    return manifest, shards
+
+
+def remove_stale_shards(directory, keep):
+    """Delete shard files (and their siblings) for seasons no longer published."""
+    for name in os.listdir(directory or "."):
+        match = SHARD_PATTERN.match(name)
+        if match and name[:len(name) - len(match.group(2) or "")] not in keep:
+            os.remove(os.path.join(directory, name))
+            print(f"  removed stale shard {name}")
+
+
+def load_manifest(path):
+    """Load the previously published manifest, or {} if there is none."""
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def race_delta(previous, published):
+    """
+    Changes between two published race lists, grouped by season: races
+    that are new or differ in any field are upserted, and races that are
+    gone or moved to another season are removed from their old season.
+    """
+    before = {race.get("id"): race for race in previous}
+    seasons = {}
+    
+    def changes(season):
+        return seasons.setdefault(season, {"upserts": [], "removed": []})
+    
+    for race in published:
+        old = before.pop(race.get("id"), None)
+        if old == race:
+            continue
+        season = season_of(race.get("date"))
+        changes(season)["upserts"].append(race)
+        if old is not None and season_of(old.get("date")) != season:
+            changes(season_of(old.get("date")))["removed"].append(race.get("id"))
+    for race_id, old in before.items():
+        changes(season_of(old.get("date")))["removed"].append(race_id)
+    return seasons
+
+
+def remove_old_deltas(delta_dir, oldest):
+    """Delete delta files for versions before oldest."""
+    if not os.path.isdir(delta_dir):
+        return
+    for name in os.listdir(delta_dir):
+        match = DELTA_PATTERN.match(name)
+        if match and int(match.group(1)) < oldest:
+            os.remove(os.path.join(delta_dir, name))
+            print(f"  removed old delta {name}")
+
+
+def publish_races(races, path=RACES_FILE, pretty=False):
+    """
+    Write the races.json the site loads, newest first, without internal
+    fields, plus columnar season shards and the manifest listing them.
+    Everything is minified, with keys in a fixed order, and gets
+    precompressed .gz (and .br, when brotli is installed) siblings. With
+    pretty, an indented copy of races.json is written for debugging.
+    
+    When the races differ from the previous races.json, the manifest
+    version is bumped and a delta with the changes is written. The
+    manifest's delta_from is the oldest version that the remaining deltas
+    can bring up to date; older clients need a full load.
+    """
+    published = [{key: race[key] for key in PUBLISHED_FIELDS if key in race} for race in races]
+    
+    # Older races may carry an alias rather than the canonical series name
+    for race in published:
+        race["series"] = canonical_series(race.get("series", ""))
+    
+    published.sort(key=lambda x: x.get("date", ""), reverse=True)
+    data = json.dumps(published, separators=(",", ":")).encode("utf-8")
+    directory = os.path.dirname(path)
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    delta_dir = os.path.join(directory, DELTA_DIR)
+    manifest, shards = shard_races(published)
+    
+    previous_manifest = load_manifest(manifest_path)
+    version = previous_manifest.get("version", 0)
+    delta_from = previous_manifest.get("delta_from", version)
+    delta = None
+    if "version" not in previous_manifest or not os.path.exists(path):
+        # Nothing to diff against: clients have to load everything
+        version += 1
+        delta_from = version
+    else:
+        changes = race_delta(load_published_races(path), published)
+        if changes:
+            version += 1
+            delta = {"format": DELTA_FORMAT, "version": version, "seasons": changes}
+    delta_from = max(delta_from, version - DELTA_HISTORY)
+    manifest["version"] = version
+    manifest["delta_from"] = delta_from
+    
+    artefacts = compressed_artefacts(path, data)
+    for name, shard in shards:
+        artefacts += compressed_artefacts(os.path.join(directory, name), shard)
+    if delta is not None:
+        os.makedirs(delta_dir, exist_ok=True)
+        delta_data = json.dumps(delta, separators=(",", ":")).encode("utf-8")
+        artefacts.append((os.path.join(delta_dir, f"delta-{version}.json"), delta_data))
+    manifest_data = json.dumps(manifest, separators=(",", ":")).encode("utf-8")
+    artefacts.append((manifest_path, manifest_data))
+    if pretty:
+        pretty_path = os.path.join(directory, PRETTY_RACES_FILE)
+        artefacts.append((pretty_path, json.dumps(published, indent=2).encode("utf-8")))
+    
+    print(f"Published {len(published)} races to {path} and {len(shards)} season shards "
+          f"(version {version})")
+    for artefact_path, artefact in artefacts:
+        size = write_artefact(artefact_path, artefact)
+        print(f"  {artefact_path:<28} {size:>10,} bytes  {size / max(len(data), 1):6.1%}")
+    remove_stale_shards(directory, {name for name, _ in shards})
+    remove_old_deltas(delta_dir, delta_from + 1)
 
 
 def extract_category_from_title(title):
@@ -272,76 +1650,348 @@ def extract_category_from_title(title):
     return "Elite"
 
 
-def main():
+# Events looked at between reorderings of the filter checks
+FILTER_REORDER_INTERVAL = 512
+
+
+@lru_cache(maxsize=4096)
+def event_date_status(date_str, cutoff):
+    """
+    Classify an event date against the cut-off (today, ISO format):
+    "past", "future" or "bad date". Zero-padded ISO dates compare as
+    strings and are only parsed to validate past ones; other shapes go
+    through strptime like before.
+    """
+    if not isinstance(date_str, str):
+        return "bad date"
+    if len(date_str) == 10 and date_str[4] == "-" and date_str[7] == "-":
+        if date_str > cutoff:
+            return "future"
+        try:
+            date.fromisoformat(date_str)
+        except ValueError:
+            return "bad date"
+        return "past"
+    try:
+        event_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return "bad date"
+    return "future" if event_date.isoformat() > cutoff else "past"
+
+
+def filter_events(events, today):
+    """
+    Keep past events in a target series, in catalogue order.
+    The check most likely to reject runs first: every
+    FILTER_REORDER_INTERVAL events the checks are re-sorted by the share
+    of the events each one evaluated that it rejected. A check that has
+    not evaluated anything yet is tried first, so it gets measured.
+    Returns (events, Counter of rejections by reason). Each rejected event
+    is counted once, under the first check that failed, so the split
+    between reasons depends on the check order.
+    """
+    cutoff = today.isoformat()
+    
+    def series_check(event):
+        return None if matches_target_series(event.get("series", "")) else "not a target series"
+    
+    def date_check(event):
+        status = event_date_status(event.get("date", ""), cutoff)
+        return None if status == "past" else status
+    
+    def rejection_rate(check):
+        evaluated = evaluated_by[check]
+        return rejected_by[check] / evaluated if evaluated else 1.0
+    
+    checks = [series_check, date_check]
+    evaluated_by = {check: 0 for check in checks}
+    rejected_by = {check: 0 for check in checks}
+    rejected = Counter()
+    filtered = []
+    
+    for i, event in enumerate(events):
+        if i and i % FILTER_REORDER_INTERVAL == 0:
+            checks.sort(key=rejection_rate, reverse=True)
+        for check in checks:
+            evaluated_by[check] += 1
+            reason = check(event)
+            if reason:
+                rejected_by[check] += 1
+                rejected[reason] += 1
+                break
+        else:
+            filtered.append(event)
+    
+    return filtered, rejected
+
+
+def payload_results(data):
+    """Results of the first category in a payload, or [] if it has none."""
+    categories = (data or {}).get("categories") or []
+    if not categories:
+        return []
+    return categories[0].get("results") or []
+
+
+def fetch_all_results(events, client=None, jobs=DEFAULT_JOBS, cache=None):
+    """
+    Fetch results for many events using a bounded worker pool.
+    Cached payloads are served from disk; only misses go to the network.
+    Returns a list of payloads in the same order as events.
+    """
+    payloads = [None] * len(events)
+    to_fetch = []
+    
+    for i, event in enumerate(events):
+        cached = cache.get(event.get("event_id")) if cache else None
+        if cached is not None:
+            payloads[i] = cached
+        else:
+            to_fetch.append(i)
+    
+    if not to_fetch:
+        return payloads
+    
+    client = client or get_client()
+    jobs = max(1, min(jobs, len(to_fetch)))
+    print(f"Fetching results for {len(to_fetch)} events with {jobs} workers...")
+    event_ids = [events[i].get("event_id") for i in to_fetch]
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        fetched = list(pool.map(lambda event_id: get_race_results(event_id, client), event_ids))
+    
+    for i, data in zip(to_fetch, fetched):
+        payloads[i] = data
+        # Payloads without results are retried later, so never cache them
+        if cache and payload_results(data):
+            cache.put(events[i].get("event_id"), data, events[i].get("date", ""))
+    
+    return payloads
+
+
+def rerate_races(races, model, cache=None):
+    """
+    Recompute score and rating for every race from its stored gap vector,
+    without any network calls. Races recorded before gap vectors existed
+    are backfilled from the results cache when it has their payload.
+    Returns (changed, unrated) counts.
+    """
+    for race in races:
+        if "gaps" in race or not cache:
+            continue
+        data = cache.get(race.get("id"), allow_stale=True)
+        categories = (data or {}).get("categories") or [{}]
+        results = categories[0].get("results", [])
+        if results:
+            race["gaps"] = encode_gaps(extract_gaps(results))
+    
+    ratable = [race for race in races if "gaps" in race]
+    scores, stars = rate_many([decode_gaps(race["gaps"]) for race in ratable], model)
+    
+    changed = 0
+    for race, score, rating in zip(ratable, scores.tolist(), stars.tolist()):
+        if race.get("score") != score or race.get("rating") != rating:
+            changed += 1
+        race["score"] = score
+        race["rating"] = rating
+        race["model"] = model.name
+    
+    return changed, len(races) - len(ratable)
+
+
+def rerate(args, model):
+    """Re-rate the whole archive locally under the selected scoring model."""
+    print("=" * 50)
+    print(f"Re-rating races with scoring model {model.name}")
+    print("=" * 50)
+    
+    started = time.perf_counter()
+    store = open_race_store(args.store)
+    races = store.load()
+    cache = ResultsCache(args.cache_dir, enabled=not args.no_cache)
+    changed, unrated = rerate_races(races, model, cache)
+    store.replace_all(races)
+    store.publish(pretty=args.pretty)
+    store.close()
+    
+    print(f"Re-rated {len(races) - unrated} races in {time.perf_counter() - started:.2f}s, "
+          f"{changed} changed")
+    if unrated:
+        print(f"{unrated} races have no stored gaps and kept their old rating")
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Cyclocross Race Ratings Scraper")
+    parser.add_argument(
+        "mode",
+        nargs="?",
+        choices=["scrape", "rerate"],
+        default="scrape",
+        help="scrape new races (default), or rerate stored races offline"
+    )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"number of results requests to run in parallel (default: {DEFAULT_JOBS})"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_RATE,
+        help=f"initial requests per second to parse.bot (default: {DEFAULT_RATE})"
+    )
+    parser.add_argument(
+        "--events-api",
+        default=EVENTS_API,
+        help="URL of the events endpoint (default: $PARSEBOT_EVENTS_API or parse.bot)"
+    )
+    parser.add_argument(
+        "--results-api",
+        default=RESULTS_API,
+        help="URL of the results endpoint (default: $PARSEBOT_RESULTS_API or parse.bot)"
+    )
+    parser.add_argument(
+        "--store",
+        choices=["jsonl", "sqlite"],
+        default="jsonl",
+        help=f"race archive backend: {RACES_STORE_FILE} (default) or {RACES_DB_FILE}"
+    )
+    parser.add_argument(
+        "--pretty",
+        action="store_true",
+        help=f"also write an indented {PRETTY_RACES_FILE} for debugging"
+    )
+    parser.add_argument(
+        "--scoring-model",
+        help="name of the model in scoring_models.json to rate with (default: its default)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=CACHE_DIR,
+        help=f"directory for cached results payloads (default: {CACHE_DIR})"
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_CACHE_TTL_HOURS,
+        help="hours before cached results for recent races are refetched "
+             f"(default: {DEFAULT_CACHE_TTL_HOURS})"
+    )
+    parser.add_argument(
+        "--full-sync",
+        action="store_true",
+        help="consider the whole event catalogue instead of only new or changed events"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always fetch results from the network"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    model = get_scoring_model(args.scoring_model)
+    
+    if args.mode == "rerate":
+        rerate(args, model)
+        return
+
     print("=" * 50)
     print("Cyclocross Race Ratings Scraper")
     print("=" * 50)
     
     # Load existing races
-    existing_races = load_existing_races()
-    existing_ids = {r.get("id") for r in existing_races}
-    print(f"Loaded {len(existing_races)} existing races")
+    store = open_race_store(args.store)
+    print(f"Loaded {store.count()} existing races")
+    
+    # One pooled session shared by every request in this run
+    client = ParseBotClient(
+        pool_size=args.jobs,
+        limiter=RateLimiter(args.rate),
+        events_url=args.events_api,
+        results_url=args.results_api
+    )
+    cache = ResultsCache(args.cache_dir, args.cache_ttl, enabled=not args.no_cache)
+    no_results = NoResultsCache(enabled=not args.no_cache)
+    sync_state = EventSyncState(enabled=not (args.no_cache or args.full_sync))
     
     # Fetch events
-    events = get_race_events()
+    events = get_race_events(client)
     
-    # Filter for target series and past races
+    # Only look at events that are new, changed or newly in the past
     today = datetime.now().date()
-    filtered_events = []
+    if sync_state.enabled and sync_state.synced_through and sync_state.series_changed:
+        print(f"{os.path.basename(SERIES_FILE)} changed since the last sync: checking the whole catalogue")
+        candidate_events = sync_state.select(events, today)
+    elif sync_state.enabled and sync_state.synced_through:
+        recheck_ids = [i for i in no_results.entries if no_results.should_fetch(i, today)]
+        candidate_events = sync_state.select(events, today, recheck_ids)
+        print(f"Incremental sync since {sync_state.synced_through}: "
+              f"{len(candidate_events)} of {len(events)} events to check")
+    else:
+        candidate_events = sync_state.select(events, today)
     
-    for event in events:
-        series = event.get("series", "")
-        event_date_str = event.get("date", "")
+    # Filter for target series and past races
+    filtered_events, rejected = filter_events(candidate_events, today)
+    
+    print(f"Found {len(filtered_events)} relevant past events")
+    if rejected:
+        print("Rejected (by first failing check): " + ", ".join(f"{count} {reason}" for reason, count in rejected.most_common()))
+    
+    # Work out which events still need fetching
+    pending_events = []
+    queued_ids = set()
+    
+    for event in filtered_events:
+        event_id = event.get("event_id")
         
-        # Check if it's a series we care about
-        if not matches_target_series(series):
+        # Skip if we already have this race, or it is listed twice
+        if store.contains(event_id) or event_id in queued_ids:
+            print(f"Skipping {event_id} - already processed")
             continue
         
-        # Parse date and check if it's in the past
-        try:
-            event_date = datetime.strptime(event_date_str, "%Y-%m-%d").date()
-            if event_date > today:
-                continue
-        except:
+        # Skip if it recently returned no results
+        if not no_results.should_fetch(event_id):
+            no_results.skipped += 1
             continue
         
-        filtered_events.append(event)
+        pending_events.append(event)
+        queued_ids.add(event_id)
     
-    print(f"Found {len(filtered_events)} relevant past events")
+    # Fetch results in parallel, then process them in catalogue order
+    payloads = fetch_all_results(pending_events, client, args.jobs, cache)
     
-    # Process each event
     new_races = []
     
-    for event in filtered_events:
+    for event, data in zip(pending_events, payloads):
         event_id = event.get("event_id")
         
-        # Skip if we already have this race
-        if event_id in existing_ids:
-            print(f"Skipping {event_id} - already processed")
-            continue
-        
         print(f"\nProcessing: {event.get('name')} ({event_id})")
         
-        # Fetch results
-        data = get_race_results(event_id)
-        
         if not data:
             print("  No results found")
+            no_results.record_empty(event_id)
             continue
         
         # Get results from categories
         categories = data.get("categories", [])
         if not categories:
             print("  No categories found")
+            no_results.record_empty(event_id)
             continue
         
         results = categories[0].get("results", [])
         if not results:
             print("  No results in category")
+            no_results.record_empty(event_id)
             continue
         
         # Calculate rating
-        score, stars = calculate_rating(results)
+        gaps = extract_gaps(results)
+        score, stars = score_gaps(gaps, model)
         
         # Extract category from title
         title = data.get("title", event.get("name", ""))
@@ -356,29 +2006,40 @@ def main():
             "id": event_id,
             "name": event.get("name", "Unknown"),
             "date": event.get("date", ""),
-            "series": event.get("series", ""),
+            "series": canonical_series(event.get("series", "")),
             "location": event.get("location", event.get("country", "")),
             "category": category,
             "rating": stars,
             "score": score,
-            "url": event.get("results_url", f"https://cyclocross24.com/race/{event_id}/")
+            "url": event.get("results_url", f"{RACE_URL_PREFIX}{event_id}/"),
+            "model": model.name,
+            "gaps": encode_gaps(gaps)
         }
         
         new_races.append(race)
-        existing_ids.add(event_id)
-    
-    # Combine with existing races
-    all_races = existing_races + new_races
-    
-    # Sort by date (newest first)
-    all_races.sort(key=lambda x: x.get("date", ""), reverse=True)
+        no_results.record_found(event_id)
     
-    # Save
-    save_races(all_races)
+    # Save the new races, then regenerate the published file
+    store.add(new_races)
+    if new_races or not os.path.exists(RACES_FILE) or not os.path.exists(MANIFEST_FILE):
+        store.publish(pretty=args.pretty)
+    total_races = store.count()
+    store.close()
+    no_results.save()
+    if events:
+        sync_state.save()
+    client.close()
     
     print(f"\n{'=' * 50}")
     print(f"Done! Added {len(new_races)} new races.")
-    print(f"Total races: {len(all_races)}")
+    print(f"Total races: {total_races}")
+    limiter = client.limiter
+    print(f"Rate limiter: {limiter.rate:.2f} req/s, {limiter.throttled} throttled responses, "
+          f"{limiter.throttle_time:.1f}s waiting across workers")
+    if cache.enabled:
+        print(f"Results cache: {cache.hits} hits, {cache.misses} misses")
+    if no_results.enabled:
+        print(f"Skipped {no_results.skipped} events awaiting a no-results recheck")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Local parse.bot stand-in for benchmarking scraper.py offline.
+Speaks the same POST contract as the events and results endpoints and
+serves recorded or synthetic fixtures, with configurable latency, error
+rate and 429 injection.
+
+    python stub_server.py --events 2000 --latency 150 --throttle-rate 0.02
+    python scraper.py --events-api http://127.0.0.1:8080/get_all_race_events \\
+                      --results-api http://127.0.0.1:8080/get_race_results
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8080
+
+# Series names as they appear in the upstream catalogue. The last few are
+# not targeted by the scraper, so the filter has something to reject.
+SYNTHETIC_SERIES = [
+    "UCI World Cup",
+    "Superprestige",
+    "X2O Trofee",
+    "Exact Cross",
+    "European Championships",
+    "World Championships",
+    "National Championships",
+    "UCI C1",
+    "UCI C2",
+    "Regional Cup",
+]
+
+SYNTHETIC_VENUES = [
+    "Koksijde", "Namur", "Dendermonde", "Zonhoven", "Hulst", "Gavere",
+    "Benidorm", "Middelkerke", "Ruddervoorde", "Overijse", "Loenhout",
+    "Baal", "Diegem", "Hoogerheide", "Maasmechelen", "Tabor", "Val di Sole",
+]
+
+
+def load_fixtures(fixtures_dir):
+    """
+    Load recorded fixtures from a directory holding events.json and a
+    results/ folder of <event_id>.json payloads. Files written by the
+    scraper's results cache ({"payload": ...}) are accepted as-is.
+    """
+    with open(os.path.join(fixtures_dir, "events.json"), "r") as f:
+        data = json.load(f)
+    events = data.get("events", []) if isinstance(data, dict) else data
+
+    results = {}
+    results_dir = os.path.join(fixtures_dir, "results")
+    if os.path.isdir(results_dir):
+        for name in os.listdir(results_dir):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(results_dir, name), "r") as f:
+                payload = json.load(f)
+            if "payload" in payload:
+                payload = payload["payload"]
+            results[name[:-5]] = payload
+    return events, results
+
+
+def format_gap(seconds):
+    """Format a gap the way cyclocross24 does (m:ss, or s.t.)."""
+    if seconds == 0:
+        return "s.t."
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def synthetic_results(rng, title, riders):
+    """Build a plausible results payload with gaps growing down the field."""
+    results = [{"position": 1, "name": "Rider 1", "Time": f"1:0{rng.randint(0, 5)}:{rng.randint(0, 59):02d}"}]
+    gap = 0
+    for position in range(2, riders + 1):
+        gap += rng.choice([0, 0, 1, 2, 3, 5, 8, 12, 20, 35])
+        results.append({"position": position, "name": f"Rider {position}", "Time": format_gap(gap)})
+    return {"title": title, "categories": [{"name": title, "results": results}]}
+
+
+def synthetic_fixtures(count, seed=0, today=None):
+    """Generate count events spread over recent seasons, most of them raced."""
+    rng = random.Random(seed)
+    today = today or date.today()
+    events = []
+    results = {}
+
+    for i in range(count):
+        event_id = f"stub-{i:06d}"
+        event_date = today - timedelta(days=rng.randint(-30, 4 * 365))
+        venue = rng.choice(SYNTHETIC_VENUES)
+        category = rng.choice(["Men Elite", "Women Elite"])
+        events.append({
+            "event_id": event_id,
+            "name": venue,
+            "date": event_date.isoformat(),
+            "series": rng.choice(SYNTHETIC_SERIES),
+            "location": venue,
+            "results_url": f"https://cyclocross24.com/race/{event_id}/"
+        })
+        # Some past events never get a classification
+        if event_date <= today and rng.random() > 0.05:
+            results[event_id] = synthetic_results(rng, f"{venue} {category}", rng.randint(25, 70))
+    return events, results
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        extra = dict(headers or {})
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data)
+            extra["Content-Encoding"] = "gzip"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in extra.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            payload = {}
+
+        with server.lock:
+            server.requests += 1
+            roll = server.rng.random()
+            delay = max(0.0, server.rng.gauss(server.latency, server.latency_jitter))
+        time.sleep(delay)
+
+        if roll < server.throttle_rate:
+            with server.lock:
+                server.throttled += 1
+            self._send_json(429, {"error": "rate limited"}, {"Retry-After": str(server.retry_after)})
+            return
+        if roll < server.throttle_rate + server.error_rate:
+            with server.lock:
+                server.errors += 1
+            self._send_json(503, {"error": "injected failure"})
+            return
+
+        path = self.path.rstrip("/")
+        if path.endswith("get_all_race_events"):
+            self._send_json(200, {"events": server.events})
+        elif path.endswith("get_race_results"):
+            event_id = str(payload.get("event_id"))
+            self._send_json(200, server.results.get(event_id, {"title": "", "categories": []}))
+        else:
+            self._send_json(404, {"error": f"unknown endpoint {self.path}"})
+
+
+def make_server(events, results, host="127.0.0.1", port=DEFAULT_PORT, latency_ms=0,
+                jitter_ms=0, error_rate=0.0, throttle_rate=0.0, retry_after=1, seed=0,
+                verbose=False):
+    """Build a stub server; call serve_forever() on it (or run it in a thread)."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.events = events
+    server.results = results
+    server.latency = latency_ms / 1000.0
+    server.latency_jitter = jitter_ms / 1000.0
+    server.error_rate = error_rate
+    server.throttle_rate = throttle_rate
+    server.retry_after = retry_after
+    server.verbose = verbose
+    server.rng = random.Random(seed)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.throttled = 0
+    server.errors = 0
+    return server
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Local parse.bot stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--fixtures",
+        help="directory with events.json and results/<event_id>.json to serve"
+    )
+    parser.add_argument(
+        "--events",
+        type=int,
+        default=500,
+        help="number of synthetic events when no fixtures are given (default: 500)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed for synthetic data and faults")
+    parser.add_argument("--latency", type=float, default=0, help="mean response latency in ms")
+    parser.add_argument("--jitter", type=float, default=0, help="latency standard deviation in ms")
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="fraction of requests answered with 503"
+    )
+    parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.0,
+        help="fraction of requests answered with 429"
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=int,
+        default=1,
+        help="Retry-After seconds sent with injected 429s (default: 1)"
+    )
+    parser.add_argument("--verbose", "-v", action="store_true", help="log every request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.fixtures:
+        events, results = load_fixtures(args.fixtures)
+    else:
+        events, results = synthetic_fixtures(args.events, args.seed)
+
+    server = make_server(
+        events, results,
+        host=args.host,
+        port=args.port,
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        verbose=args.verbose
+    )
+    base = f"http://{args.host}:{server.server_port}"
+    print(f"Serving {len(events)} events ({len(results)} with results) on {base}")
+    print(f"  PARSEBOT_EVENTS_API={base}/get_all_race_events")
+    print(f"  PARSEBOT_RESULTS_API={base}/get_race_results")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nServed {server.requests} requests "
+              f"({server.throttled} throttled, {server.errors} errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+// Service worker for the ratings site. The page and race data are served
+// straight from the cache and revalidated in the background, so repeat
+// visits render without waiting on the network and the site works
+// offline. Season shards are requested as races-2025-26.json?v=<hash>
+// from manifest.json, so a cached shard never goes stale: it is served
+// cache-first, and shards no longer listed are dropped when a new
+// manifest arrives. Delta files never change once written either.
+
+const CACHE = 'cx-race-ratings-v1';
+const SHELL = ['./', 'index.html', 'races-worker.js', 'manifest.json'];
+const SHARD_PATTERN = /\/races-(\d{4}-\d{2}|undated)\.json$/;
+const DELTA_PATTERN = /\/deltas\/delta-\d+\.json$/;
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE)
+            .then(cache => cache.addAll(SHELL))
+            .catch(error => console.warn('Could not precache the site:', error))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(key => key !== CACHE).map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+async function cacheFirst(request) {
+    const cache = await caches.open(CACHE);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok) await cache.put(request, response.clone());
+    return response;
+}
+
+// Drop cached shards whose hash is not in the new manifest and deltas it
+// no longer needs, then let the pages know so they reload their races
+async function manifestUpdated(response) {
+    const manifest = await response.json();
+    const current = new Set(manifest.shards.map(shard => `${shard.file}:${shard.sha256.slice(0, 12)}`));
+    const cache = await caches.open(CACHE);
+    for (const request of await cache.keys()) {
+        const url = new URL(request.url);
+        const file = url.pathname.split('/').pop();
+        const stale = SHARD_PATTERN.test(url.pathname) ?
+            !current.has(`${file}:${url.searchParams.get('v')}`) :
+            DELTA_PATTERN.test(url.pathname) && parseInt(file.slice(6)) <= manifest.delta_from;
+        if (stale) await cache.delete(request);
+    }
+    const clients = await self.clients.matchAll({ type: 'window' });
+    clients.forEach(client => client.postMessage({ type: 'races-updated' }));
+}
+
+// Answer from the cache when possible and refresh the entry in the
+// background; onChange runs when the fresh copy differs from the cached one
+async function staleWhileRevalidate(event, onChange) {
+    const cache = await caches.open(CACHE);
+    const request = event.request;
+    let cached = await cache.match(request);
+    if (!cached && request.mode === 'navigate') {
+        cached = await cache.match('index.html') || await cache.match('./');
+    }
+
+    // Read the cached copy before it is handed to the page, which
+    // consumes its body
+    const cachedText = onChange && cached ? cached.clone().text() : null;
+
+    const network = fetch(request.mode === 'navigate' ? request : new Request(request, { cache: 'no-cache' }))
+        .then(async response => {
+            if (!response.ok) return response;
+            const changed = cachedText && await cachedText !== await response.clone().text();
+            await cache.put(request, response.clone());
+            if (changed) await onChange(response.clone());
+            return response;
+        });
+
+    if (cached) {
+        event.waitUntil(network.catch(error => console.warn(`Could not revalidate ${request.url}:`, error)));
+        return cached;
+    }
+    return network;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== 'GET' || url.origin !== self.location.origin) return;
+
+    if ((SHARD_PATTERN.test(url.pathname) && url.searchParams.has('v')) || DELTA_PATTERN.test(url.pathname)) {
+        event.respondWith(cacheFirst(request));
+    } else if (url.pathname.endsWith('/manifest.json')) {
+        event.respondWith(staleWhileRevalidate(event, manifestUpdated));
+    } else {
+        event.respondWith(staleWhileRevalidate(event));
+    }
+});